@@ -8,27 +8,19 @@ Created on Sat Mar 25 13:11:49 2023
 """
 
 #import libraries
-import pandas as pd
 import streamlit as st
 import altair as alt
-import numpy as np
 from datetime import datetime
+from pizza_place import shared
 
-st.set_page_config(
-    page_title = "Pizza Place Analysis",
-    page_icon = ":pizza:"
-    )
-
-# import main dataframes
-df_order_details = st.session_state['df_order_details']
-df_orders = st.session_state['df_orders']
-df_pizza_types = st.session_state['df_pizza_types']
-df_pizzas = st.session_state['df_pizzas']
+shared.page_config("orders")
 
 # date slider
 sl_order_start_date = st.sidebar.date_input("Start Date:", datetime(2015, 1, 1))
 sl_order_end_date = st.sidebar.date_input("End Date:", datetime(2015, 12, 31))
-df_orders = df_orders[(df_orders["datetime"] >= datetime.strptime(str(sl_order_start_date), "%Y-%m-%d")) & (df_orders["datetime"] <= datetime.strptime(str(sl_order_end_date), "%Y-%m-%d"))]
+
+# import the analytics engine, only the months in the date range are loaded
+engine = shared.analytics(sl_order_start_date, sl_order_end_date)
 
 
 # title of page
@@ -38,7 +30,12 @@ st.title(":clipboard: Orders")
 st.subheader(":bar_chart: Key Performance Indicators")
 
 # some metrics
-st.metric("Total Orders", str(df_orders["order_id"].max()))
+total_orders = engine.order_kpis(sl_order_start_date, sl_order_end_date)["total_orders"]
+st.metric("Total Orders", str(total_orders))
+if not total_orders:
+    st.error("No Orders Between These Dates")
+    shared.admin_panel()
+    st.stop()
 
 # historgram of data
 st.subheader(':calendar: Pizza Orders by Date')
@@ -46,11 +43,8 @@ st.subheader(':calendar: Pizza Orders by Date')
 tab_orders_by_day, tab_orders_by_month, tab_orders_by_quarter = st.tabs(["Day", "Month", "Quarter"])
 
 with tab_orders_by_day:
-    x = df_orders.datetime.dt.date
     # create dataframe of pizza orders by period
-    df_orders_count_orders = (df_orders.groupby([x])["order_id"].count().rename("Number of Orders")).to_frame()
-    df_orders_count_orders["datetime"] = df_orders_count_orders.index
-    df_orders_count_orders.rename(columns = {'datetime':'Date'}, inplace = True)
+    df_orders_count_orders = engine.orders_by_period(sl_order_start_date, sl_order_end_date, "day")
 
     col_avg_orders, col_max_orders, col_min_orders = st.columns(3)
 
@@ -59,19 +53,17 @@ with tab_orders_by_day:
     col_max_orders.metric("Daily Max Orders", round(df_orders_count_orders["Number of Orders"].max()))
     col_min_orders.metric("Daily Min Orders", round(df_orders_count_orders["Number of Orders"].min()))
 
-    # create the chart
-    c_count_orders = alt.Chart(df_orders_count_orders).mark_line() \
-                                 .encode(x=alt.X('Date', sort=["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]), 
+    # chart hours, days or weeks depending on the range, capped in points
+    step, df_timeline = engine.orders_timeline(sl_order_start_date, sl_order_end_date)
+    c_count_orders = alt.Chart(df_timeline).mark_line() \
+                                 .encode(x=alt.X('Date', title=step.title()), 
                                          y='Number of Orders')
     # write the chart to streamlit
-    st.altair_chart(c_count_orders, use_container_width=True)
+    shared.chart("orders_by_day", c_count_orders)
     
 with tab_orders_by_month:
-    x = df_orders.datetime.dt.month_name()
     # create dataframe of pizza orders by period
-    df_orders_count_orders = (df_orders.groupby([x])["order_id"].count().rename("Number of Orders")).to_frame()
-    df_orders_count_orders["datetime"] = df_orders_count_orders.index
-    df_orders_count_orders.rename(columns = {'datetime':'Date'}, inplace = True)
+    df_orders_count_orders = engine.orders_by_period(sl_order_start_date, sl_order_end_date, "month")
 
     col_avg_orders, col_max_orders, col_min_orders = st.columns(3)
 
@@ -85,15 +77,11 @@ with tab_orders_by_month:
                                  .encode(x=alt.X('Date', sort=["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]), 
                                          y='Number of Orders')
     # write the chart to streamlit
-    st.altair_chart(c_count_orders, use_container_width=True)
+    shared.chart("orders_by_month", c_count_orders)
 
 with tab_orders_by_quarter:
-    df_orders["quarter"] = ((df_orders.datetime.dt.month - 1) // 3) + 1
-    x = df_orders["quarter"]
     # create dataframe of pizza orders by period
-    df_orders_count_orders = (df_orders.groupby([x])["order_id"].count().rename("Number of Orders")).to_frame()
-    df_orders_count_orders["quarter"] = df_orders_count_orders.index
-    df_orders_count_orders.rename(columns = {'quarter':'Quarter'}, inplace = True)
+    df_orders_count_orders = engine.orders_by_period(sl_order_start_date, sl_order_end_date, "quarter")
 
     col_avg_orders, col_max_orders, col_min_orders = st.columns(3)
 
@@ -107,7 +95,8 @@ with tab_orders_by_quarter:
                                  .encode(x=alt.X('Quarter', sort=["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]), 
                                          y='Number of Orders')
     # write the chart to streamlit
-    st.altair_chart(c_count_orders, use_container_width=True)
+    shared.chart("orders_by_quarter", c_count_orders)
+
 
 
 
@@ -115,24 +104,17 @@ with tab_orders_by_quarter:
 
 # histogram of specific hour
 st.subheader(':clock3: Pizzas Ordered by Hour')
-hist_values = np.histogram(df_orders["datetime"].dt.hour, bins=24, range=(0,24))[0]
-df_orders_by_hour = pd.DataFrame()
-df_orders_by_hour["Orders"] = hist_values
-df_orders_by_hour["Hour"] = df_orders_by_hour.index
-
-df_orders_by_hour_avg = df_orders_by_hour.copy()
-days_range = sl_order_end_date - sl_order_start_date
-df_orders_by_hour_avg["Orders"] = df_orders_by_hour_avg["Orders"] / days_range.days
+df_orders_by_hour = engine.orders_by_hour(sl_order_start_date, sl_order_end_date)
 
 tab_orders_by_hour_total, tab_orders_by_hour_avg = st.tabs(["Total", "Average"])
 
 with tab_orders_by_hour_total:
     c_orders_by_hour = alt.Chart(df_orders_by_hour).mark_bar(size=20).encode(alt.X('Hour', scale=alt.Scale(domain=(0, 23))), y='Orders')
-    st.altair_chart(c_orders_by_hour, use_container_width=True)
+    shared.chart("orders_by_hour_total", c_orders_by_hour)
     
 with tab_orders_by_hour_avg:
-    c_orders_by_hour = alt.Chart(df_orders_by_hour_avg).mark_bar(size=20).encode(alt.X('Hour', scale=alt.Scale(domain=(0, 23))), y='Orders')
-    st.altair_chart(c_orders_by_hour, use_container_width=True)
+    c_orders_by_hour = alt.Chart(df_orders_by_hour).mark_bar(size=20).encode(alt.X('Hour', scale=alt.Scale(domain=(0, 23))), y=alt.Y('Average', title='Orders'))
+    shared.chart("orders_by_hour_average", c_orders_by_hour)
 
 
 
@@ -140,67 +122,72 @@ with tab_orders_by_hour_avg:
 
 # number of pizzas in a typical order
 st.subheader(':page_with_curl: Pizzas in a Typical Order')
-ls_date_range = df_orders["order_id"].to_list()
-df_order_details = df_order_details.loc[df_order_details['order_id'].isin(ls_date_range)]
-
-df_order_details_sort = df_order_details.groupby(["order_id"])["quantity"].sum().to_frame()
-avg_pizza_order = df_order_details_sort.mean()
+basket_stats = engine.basket_stats(sl_order_start_date, sl_order_end_date)
 
 col_avg_pizza, col_max_pizza, col_min_pizza = st.columns(3)
-col_avg_pizza.metric("Average Amount of Pizzas in Order", round(avg_pizza_order, 1))
-col_max_pizza.metric("Most Amount of Pizzas in Order", df_order_details_sort["quantity"].max())
-col_min_pizza.metric("Least Amount of Pizzas in Order", df_order_details_sort["quantity"].min())
+col_avg_pizza.metric("Average Amount of Pizzas in Order", round(basket_stats["mean"], 1))
+col_max_pizza.metric("Most Amount of Pizzas in Order", basket_stats["max"])
+col_min_pizza.metric("Least Amount of Pizzas in Order", basket_stats["min"])
 
+# percentiles and histogram from the daily sketches
+pizza_quantiles = engine.order_quantiles(sl_order_start_date, sl_order_end_date, "quantity")
+col_p50_pizza, col_p90_pizza, col_p99_pizza = st.columns(3)
+col_p50_pizza.metric("Median Pizzas in Order", round(pizza_quantiles["p50"]))
+col_p90_pizza.metric("90th Percentile Pizzas in Order", round(pizza_quantiles["p90"]))
+col_p99_pizza.metric("99th Percentile Pizzas in Order", round(pizza_quantiles["p99"]))
+
+df_pizza_histogram = engine.order_histogram(sl_order_start_date, sl_order_end_date, "quantity")
+c_pizza_histogram = alt.Chart(df_pizza_histogram).mark_bar() \
+                                 .encode(x=alt.X('From', bin='binned', title='Pizzas in Order'), x2='To',
+                                         y='Orders')
+shared.chart("pizzas_per_order", c_pizza_histogram)
 
 
 
-# best sellers by pizza id
-st.subheader(':chart_with_upwards_trend: Best Sellers')
-df_order_bestsellers = (df_order_details.groupby(["pizza_id"])["quantity"].sum()).to_frame().reset_index()
 
+# pizzas ordered together
+st.subheader(':handshake: Frequently Bought Together')
 
-# best sellers
-df_order_bestsellers = pd.merge(df_pizzas, df_order_bestsellers, on='pizza_id', how='left')
-df_order_bestsellers = pd.merge(df_pizza_types, df_order_bestsellers, on='pizza_type_id', how='left') 
-df_order_pizza_id_bestsellers = (df_order_bestsellers.groupby(["pizza_id"])["quantity"].sum()).to_frame().reset_index()
-df_order_name_bestsellers = (df_order_bestsellers.groupby(["name"])["quantity"].sum()).to_frame().reset_index()
-df_order_size_bestsellers = (df_order_bestsellers.groupby(["size"])["quantity"].sum()).to_frame().reset_index()
-df_order_category_bestsellers = (df_order_bestsellers.groupby(["category"])["quantity"].sum()).to_frame().reset_index()
+tab_basket_name, tab_basket_type = st.tabs(["Name", "Type"])
 
-# create ingredients list
-ingredients = df_order_bestsellers
-ingredients["ingredients"] = ingredients["ingredients"].str.split(', ')
-ingredients = ingredients.explode('ingredients')
-df_order_ingredients_bestsellers = (ingredients.groupby(["ingredients"])["quantity"].sum()).to_frame().reset_index()
+for tab_basket, level in [(tab_basket_name, "name"), (tab_basket_type, "pizza_id")]:
+    with tab_basket:
+        # top pairs by orders holding both, lift above 1 means more often than by chance
+        st.dataframe(engine.basket_pairs(sl_order_start_date, sl_order_end_date, level), use_container_width=True)
+
+        # what goes with one pizza
+        members = engine.baskets.matrices[level][0]
+        sb_bought_with = st.selectbox("Bought With:", members, key="bought_with_" + level)
+        st.dataframe(engine.bought_with(sl_order_start_date, sl_order_end_date, sb_bought_with, level), use_container_width=True)
+
+
+
+
+# best sellers by pizza id
+st.subheader(':chart_with_upwards_trend: Best Sellers')
 
 tab_name, tab_type, tab_category, tab_size, tab_ingredients = st.tabs(["Name", "Type", "Category", "Size", "Ingredients"])
 
 with tab_name:
     # chart name by quantity
-    df_order_name_bestsellers.rename(columns = {'quantity':'Quantity', 'name':'Name'}, inplace = True)
-    st.dataframe(df_order_name_bestsellers.sort_values(by=['Quantity'], ascending=False), use_container_width=True)
+    st.dataframe(engine.best_sellers(sl_order_start_date, sl_order_end_date, "name", "quantity"), use_container_width=True)
 
 with tab_type:
     # chart pizza type and size by quantity
-    df_order_pizza_id_bestsellers.rename(columns = {'quantity':'Quantity', 'pizza_id':'Pizza ID'}, inplace = True)
-    st.dataframe(df_order_pizza_id_bestsellers.sort_values(by=['Quantity'], ascending=False), use_container_width=True)
+    st.dataframe(engine.best_sellers(sl_order_start_date, sl_order_end_date, "pizza_id", "quantity"), use_container_width=True)
 
 with tab_category:
     # chart category by quantity
-    df_order_category_bestsellers.rename(columns = {'quantity':'Quantity', 'category':'Category'}, inplace = True)
-    st.dataframe(df_order_category_bestsellers.sort_values(by=['Quantity'], ascending=False), use_container_width=True)
+    st.dataframe(engine.best_sellers(sl_order_start_date, sl_order_end_date, "category", "quantity"), use_container_width=True)
 
 with tab_size:
     # chart size by quantity
-    df_order_size_bestsellers.rename(columns = {'quantity':'Quantity', 'size':'Size'}, inplace = True)
-    st.dataframe(df_order_size_bestsellers.sort_values(by=['Quantity'], ascending=False), use_container_width=True)
+    st.dataframe(engine.best_sellers(sl_order_start_date, sl_order_end_date, "size", "quantity"), use_container_width=True)
 
 with tab_ingredients:
     # chart ingredients by quantity
-    df_order_ingredients_bestsellers.rename(columns = {'quantity':'Quantity', 'ingredients':'Ingredients'}, inplace = True)
-    st.dataframe(df_order_ingredients_bestsellers.sort_values(by=['Quantity'], ascending=False), use_container_width=True)
-
-
-
+    st.dataframe(engine.best_sellers(sl_order_start_date, sl_order_end_date, "ingredients", "quantity"), use_container_width=True)
 
 
+# hidden performance panel
+shared.admin_panel()
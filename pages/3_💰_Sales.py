@@ -9,49 +9,50 @@ Created on Thu Mar 23 20:37:12 2023
 
 #import libraries
 import streamlit as st
-import pandas as pd
 import altair as alt
-import matplotlib as plt
 from datetime import datetime 
-from statsmodels.tsa import seasonal as smts
+from pizza_place import charts, shared
 
-st.set_page_config(
-    page_title = "Pizza Place Analysis",
-    page_icon = ":pizza:"
-    )
+shared.page_config("sales")
 
 # title of page
 st.title(":moneybag: Sales")
 
-# import main dataframes
-df_order_details = st.session_state['df_order_details']
-df_orders = st.session_state['df_orders']
-df_pizza_types = st.session_state['df_pizza_types']
-df_pizzas = st.session_state['df_pizzas']
-
 # date slider
 sl_order_start_date = st.sidebar.date_input("Start Date:", datetime(2015, 1, 1))
 sl_order_end_date = st.sidebar.date_input("End Date:", datetime(2015, 12, 31))
-df_orders = df_orders[(df_orders["datetime"] >= datetime.strptime(str(sl_order_start_date), "%Y-%m-%d")) & (df_orders["datetime"] <= datetime.strptime(str(sl_order_end_date), "%Y-%m-%d"))]
+
+# import the analytics engine, only the months in the date range are loaded
+engine = shared.analytics(sl_order_start_date, sl_order_end_date)
     
-# price per order
-df_order_price = pd.merge(df_order_details, df_pizzas, on='pizza_id', how='left')
-df_order_price = (df_order_price.groupby(["order_id"])["price"].sum()).to_frame().reset_index()
-df_order_price = pd.merge(df_orders, df_order_price, on='order_id', how='left')
-tot_sales = round(df_order_price["price"].sum(), 2)
-avg_order_price = round(df_order_price["price"].mean(), 2)
-max_order_price = round(df_order_price["price"].max(), 2)
-min_order_price = round(df_order_price["price"].min(), 2)
+sales_kpis = engine.sales_kpis(sl_order_start_date, sl_order_end_date)
 
 # Key Performace Indcators
 st.subheader(":bar_chart: Key Performance Indicators")
 
 # some metrics
-st.metric("Total Sales", "${:,.2f}".format(tot_sales))
+st.metric("Total Sales", "${:,.2f}".format(sales_kpis["total_sales"]))
+if not engine.order_kpis(sl_order_start_date, sl_order_end_date)["total_orders"]:
+    st.error("No Sales Between These Dates")
+    shared.admin_panel()
+    st.stop()
 col_avg_sales, col_max_sales, col_min_sales = st.columns(3)
-col_avg_sales.metric("Average Order Sale", "${:,.2f}".format(avg_order_price))
-col_max_sales.metric("Largest Order Sale", "${:,.2f}".format(max_order_price))
-col_min_sales.metric("Smallest Order Sale", "${:,.2f}".format(min_order_price))
+col_avg_sales.metric("Average Order Sale", "${:,.2f}".format(sales_kpis["mean_order"]))
+col_max_sales.metric("Largest Order Sale", "${:,.2f}".format(sales_kpis["max_order"]))
+col_min_sales.metric("Smallest Order Sale", "${:,.2f}".format(sales_kpis["min_order"]))
+
+# percentiles and histogram from the daily sketches
+order_quantiles = engine.order_quantiles(sl_order_start_date, sl_order_end_date, "revenue")
+col_p50_sales, col_p90_sales, col_p99_sales = st.columns(3)
+col_p50_sales.metric("Median Order Sale", "${:,.2f}".format(order_quantiles["p50"]))
+col_p90_sales.metric("90th Percentile Order Sale", "${:,.2f}".format(order_quantiles["p90"]))
+col_p99_sales.metric("99th Percentile Order Sale", "${:,.2f}".format(order_quantiles["p99"]))
+
+df_order_histogram = engine.order_histogram(sl_order_start_date, sl_order_end_date, "revenue")
+c_order_histogram = alt.Chart(df_order_histogram).mark_bar() \
+                                 .encode(x=alt.X('From', bin='binned', title='Order Sale'), x2='To',
+                                         y='Orders')
+shared.chart("order_sales", c_order_histogram)
 
 
 # how much money did we make this year?
@@ -62,26 +63,24 @@ tab_sales_by_day, tab_sales_by_month, tab_sales_by_quarter = st.tabs(["Day", "Mo
 
 with tab_sales_by_day:
     # sales per day
-    df_sales = (df_order_price.groupby([df_order_price.datetime.dt.date])["price"].sum()).to_frame().reset_index()
-    df_sales.rename(columns = {'datetime':'Date', 'price':'Sales'}, inplace = True)
+    df_sales = engine.sales_by_period(sl_order_start_date, sl_order_end_date, "day")
     
     col_avg_sales, col_max_sales, col_min_sales = st.columns(3)
     col_avg_sales.metric("Average Daily Sales", "${:,.2f}".format(round(df_sales["Sales"].mean())))
     col_max_sales.metric("Largest Daily Sales", "${:,.2f}".format(round(df_sales["Sales"].max())))
     col_min_sales.metric("Smallest Daily Sales", "${:,.2f}".format(round(df_sales["Sales"].min())))
     
-    # create the chart
-    c_sales = alt.Chart(df_sales).mark_line() \
-                                 .encode(x=alt.X('Date', sort=["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]), 
+    # chart hours, days or weeks depending on the range, capped in points
+    step, df_timeline = engine.sales_timeline(sl_order_start_date, sl_order_end_date)
+    c_sales = alt.Chart(df_timeline).mark_line() \
+                                 .encode(x=alt.X('Date', title=step.title()), 
                                          y='Sales')
     # write the chart to streamlit
-    st.altair_chart(c_sales, use_container_width=True)
+    shared.chart("sales_by_day", c_sales)
     
 with tab_sales_by_month:
     # sales per day
-    df_sales = (df_order_price.groupby([df_order_price.datetime.dt.month_name()])["price"].sum()).to_frame().reset_index()
-    avg_sales_by_month = round(df_sales["price"].mean(), 2)
-    df_sales.rename(columns = {'datetime':'Date', 'price':'Sales'}, inplace = True)
+    df_sales = engine.sales_by_period(sl_order_start_date, sl_order_end_date, "month")
     
     col_avg_sales, col_max_sales, col_min_sales = st.columns(3)
     col_avg_sales.metric("Average Monthly Sales", "${:,.2f}".format(round(df_sales["Sales"].mean())))
@@ -93,15 +92,11 @@ with tab_sales_by_month:
                                  .encode(x=alt.X('Date', sort=["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]), 
                                          y='Sales')
     # write the chart to streamlit
-    st.altair_chart(c_sales, use_container_width=True)
+    shared.chart("sales_by_month", c_sales)
 
 with tab_sales_by_quarter:
-    df_order_price["quarter"] = ((df_order_price.datetime.dt.month - 1) // 3) + 1
-    x = df_order_price["quarter"]
     # sales per day
-    df_sales = (df_order_price.groupby([x])["price"].sum()).to_frame().reset_index()
-    avg_sales_by_month = round(df_sales["price"].mean(), 2)
-    df_sales.rename(columns = {'quarter':'Quarter', 'price':'Sales'}, inplace = True)
+    df_sales = engine.sales_by_period(sl_order_start_date, sl_order_end_date, "quarter")
     
     col_avg_sales, col_max_sales, col_min_sales = st.columns(3)
     col_avg_sales.metric("Average Quarterly Sales", "${:,.2f}".format(round(df_sales["Sales"].mean())))
@@ -112,56 +107,32 @@ with tab_sales_by_quarter:
                                  .encode(x=alt.X('Quarter', sort=["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]), 
                                          y='Sales')
     # write the chart to streamlit
-    st.altair_chart(c_sales, use_container_width=True)
+    shared.chart("sales_by_quarter", c_sales)
 
 
 # best sellers by sales
 st.subheader(":chart_with_upwards_trend: Best Sellers")
-df_order_bestsellers = pd.merge(df_orders, df_order_details, on='order_id', how='left')
-df_order_bestsellers = (df_order_bestsellers.groupby(["pizza_id"])["quantity"].sum()).to_frame().reset_index()
-
-
-# best sellers
-df_order_bestsellers = pd.merge(df_pizzas, df_order_bestsellers, on='pizza_id', how='left')
-df_order_bestsellers = pd.merge(df_pizza_types, df_order_bestsellers, on='pizza_type_id', how='left') 
-df_order_bestsellers["Sales"] = df_order_bestsellers["price"] * df_order_bestsellers["quantity"]
-df_order_pizza_id_bestsellers = (df_order_bestsellers.groupby(["pizza_id"])["Sales"].sum()).to_frame().reset_index()
-df_order_name_bestsellers = (df_order_bestsellers.groupby(["name"])["Sales"].sum()).to_frame().reset_index()
-df_order_size_bestsellers = (df_order_bestsellers.groupby(["size"])["Sales"].sum()).to_frame().reset_index()
-df_order_category_bestsellers = (df_order_bestsellers.groupby(["category"])["Sales"].sum()).to_frame().reset_index()
-
-# create ingredients list
-ingredients = df_order_bestsellers
-ingredients["ingredients"] = ingredients["ingredients"].str.split(', ')
-ingredients = ingredients.explode('ingredients')
-df_order_ingredients_bestsellers = (ingredients.groupby(["ingredients"])["Sales"].sum()).to_frame().reset_index()
-
 tab_name, tab_type, tab_category, tab_size, tab_ingredients = st.tabs(["Name", "Type", "Category", "Size", "Ingredients"])
 
 with tab_name:
     # chart name by quantity
-    df_order_name_bestsellers.rename(columns = {'name':'Name'}, inplace = True)
-    st.dataframe(df_order_name_bestsellers.sort_values(by=['Sales'], ascending=False), use_container_width=True)
+    st.dataframe(engine.best_sellers(sl_order_start_date, sl_order_end_date, "name", "revenue"), use_container_width=True)
 
 with tab_type:
     # chart pizza type and size by quantity
-    df_order_pizza_id_bestsellers.rename(columns = {'pizza_id':'Pizza ID'}, inplace = True)
-    st.dataframe(df_order_pizza_id_bestsellers.sort_values(by=['Sales'], ascending=False), use_container_width=True)
+    st.dataframe(engine.best_sellers(sl_order_start_date, sl_order_end_date, "pizza_id", "revenue"), use_container_width=True)
 
 with tab_category:
     # chart category by quantity
-    df_order_category_bestsellers.rename(columns = {'category':'Category'}, inplace = True)
-    st.dataframe(df_order_category_bestsellers.sort_values(by=['Sales'], ascending=False), use_container_width=True)
+    st.dataframe(engine.best_sellers(sl_order_start_date, sl_order_end_date, "category", "revenue"), use_container_width=True)
 
 with tab_size:
     # chart size by quantity
-    df_order_size_bestsellers.rename(columns = {'size':'Size'}, inplace = True)
-    st.dataframe(df_order_size_bestsellers.sort_values(by=['Sales'], ascending=False), use_container_width=True)
+    st.dataframe(engine.best_sellers(sl_order_start_date, sl_order_end_date, "size", "revenue"), use_container_width=True)
 
 with tab_ingredients:
     # chart ingredients by quantity
-    df_order_ingredients_bestsellers.rename(columns = {'ingredients':'Ingredients'}, inplace = True)
-    st.dataframe(df_order_ingredients_bestsellers.sort_values(by=['Sales'], ascending=False), use_container_width=True)
+    st.dataframe(engine.best_sellers(sl_order_start_date, sl_order_end_date, "ingredients", "revenue"), use_container_width=True)
 
 
 
@@ -173,24 +144,23 @@ days_range = sl_order_end_date - sl_order_start_date
 if days_range.days < 14:
     st.error("Date Range Must Be Greater Than 14 Days To See Seasonality in Sales")
 else:
-    df_seasonal_sales = (df_order_price.groupby([df_order_price.datetime.dt.date])["price"].sum()).to_frame().reset_index()
-    analysis = df_seasonal_sales[['price']].copy()
-    
-    
-    decompose_result_mult = smts.seasonal_decompose(analysis, model="multiplicative", period=7)
-    
-    trend = decompose_result_mult.trend
-    seasonal = decompose_result_mult.seasonal
-    residual = decompose_result_mult.resid
-    
-    st.write(decompose_result_mult.plot())
-
-
-
-
-
-
-
-
-
-
+    # one series for the total, or one per category, size or pizza
+    seasonal_group = st.radio("Series:", ["Total", "Category", "Size", "Pizza"], horizontal=True)
+    by = {"Total": None, "Category": "category", "Size": "size", "Pizza": "name"}[seasonal_group]
+    df_seasonality = engine.seasonality(sl_order_start_date, sl_order_end_date, by)
+    if df_seasonality.empty:
+        # the series only have the days with sales
+        st.error("Need At Least 14 Days With Sales To See Seasonality in Sales")
+    else:
+        # one chart per component, coloured by series, long ranges downsampled per series
+        for component, title in [("observed", "Sales"), ("trend", "Trend"), ("seasonal", "Seasonal"), ("resid", "Residual")]:
+            df_component = charts.downsample(df_seasonality[["Date", "Series", component]], "Date", component, "Series")
+            c_component = alt.Chart(df_component).mark_line() \
+                                                   .encode(x='Date', 
+                                                           y=alt.Y(component, title=title),
+                                                           color=alt.Color('Series', legend=None if by is None else alt.Legend()))
+            shared.chart("seasonality_" + component, c_component)
+
+
+# hidden performance panel
+shared.admin_panel()
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+python -m pizza_place
+"""
+
+from pizza_place import cli
+
+cli.main()
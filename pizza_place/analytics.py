@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Analytics
+
+Headless analytics engine behind the Streamlit pages. Every result the
+pages show is a method taking an inclusive [start, end] date range, so it
+can be imported, profiled and run from the command line without the UI.
+"""
+
+# import libraries
+import copy
+import functools
+
+import numpy as np
+import pandas as pd
+
+from pizza_place import basket, browser, cache, charts, cube, facts, ingredients, kpis, seasonality, sketches, storage, timeindex, views
+
+
+PERIODS = ["day", "month", "quarter"]
+DIMENSIONS = ["name", "pizza_id", "category", "size", "ingredients"]
+VALUES = ["quantity", "revenue"]
+# total sales (None) or one series per member of these
+SEASONAL_GROUPS = [None, "category", "size", "name"]
+
+# column names as shown in the app
+COLUMNS = {'quantity':'Quantity', 'revenue':'Sales', 'pizza_id':'Pizza ID', 'name':'Name',
+           'category':'Category', 'size':'Size', 'ingredients':'Ingredients'}
+
+
+def _cached(method):
+    """
+    serve the method from the materialized views or the result cache, keyed
+    on its name and arguments
+    """
+    @functools.wraps(method)
+    def wrapper(self, start, end, *args):
+        name = (method.__name__,) + args
+        if self.views is not None:
+            try:
+                value = self.views.get(name, start, end)
+            except KeyError:
+                pass
+            else:
+                self.results.count_view_hit()
+                return value
+        return self.results.get(name, self.version, start, end, lambda s, e: method(self, s, e, *args))
+    wrapper.cached = True
+    return wrapper
+
+
+def _cached_latest(method):
+    """
+    like _cached for a result of the latest data rather than of a date
+    range, keyed on the engine's whole range
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        return self.results.get((method.__name__,) + args, self.version, self.first_date, self.last_date,
+                                lambda s, e: method(self, *args))
+    wrapper.cached = True
+    wrapper.ranged = False
+    return wrapper
+
+
+def page_views(start, end):
+    """(method, args) of every result the pages show for the range, as the pages call them"""
+    yield "order_kpis", ()
+    yield "sales_kpis", ()
+    yield "basket_stats", ()
+    yield "orders_by_hour", ()
+    for value in VALUES:
+        yield "order_quantiles", (value,)
+        yield "order_histogram", (value,)
+    yield "orders_timeline", ()
+    yield "sales_timeline", ()
+    for period in PERIODS:
+        yield "orders_by_period", (period,)
+        yield "sales_by_period", (period,)
+    for level in basket.LEVELS:
+        yield "basket_pairs", (level,)
+    for value in VALUES:
+        for by in DIMENSIONS:
+            yield "best_sellers", (by, value)
+    # the sales page only decomposes ranges of two weeks or more
+    if (pd.Timestamp(end) - pd.Timestamp(start)).days >= 14:
+        for by in SEASONAL_GROUPS:
+            yield "seasonality", (by,)
+
+
+class Analytics:
+    """
+    Holds the fact table, its time index, the rollup cube, the daily order
+    sketches, the basket and ingredient matrices for one version of the
+    data.
+
+    Results are shared through the result cache (or the materialized
+    views) and must be treated as read only.
+    """
+
+    def __init__(self, df_order_details, df_orders, df_pizza_types, df_pizzas, version=None, results=None, views=None):
+        self.version = version
+        self.results = cache.RESULTS if results is None else results
+        self.views = views
+        self.df_order_details = df_order_details
+        self.df_orders = df_orders.assign(datetime=pd.to_datetime(df_orders["timestamp"], unit="s"))
+        self.df_pizza_types = df_pizza_types
+        self.df_pizzas = df_pizzas
+        self.df_pizza_dims = facts.build_pizza_dimensions(df_pizza_types, df_pizzas)
+        self.df_order_lines = facts.build_order_lines(df_order_details, df_orders, df_pizza_types, df_pizzas)
+        self.order_index = facts.OrderIndex.build(df_orders)
+        self.cube = cube.RollupCube.build(self.df_order_lines, self.df_orders, self.df_pizza_dims)
+        self.period_totals = kpis.PeriodTotals.from_cube(self.cube)
+        self.order_sketches = sketches.build_order_sketches(self.df_order_lines)
+        self.ingredient_matrix = ingredients.IngredientMatrix.build(df_pizza_types)
+        self.baskets = basket.BasketMatrix.build(self.df_order_lines)
+        self._index()
+
+    def _index(self):
+        """time index and raw table browsers over the current frames"""
+        self.line_index = timeindex.TimeIndex(self.df_order_lines["datetime"])
+        # raw data, paged on the server
+        self.raw_tables = {
+            "orders": browser.TableBrowser(self.df_orders[["order_id", "datetime"]]),
+            "order_details": browser.TableBrowser(self.df_order_lines[
+                ["order_details_id", "order_id", "datetime", "pizza_id", "size", "quantity"]]),
+            "pizzas": browser.TableBrowser(self.df_pizzas),
+            "pizza_types": browser.TableBrowser(self.df_pizza_types),
+        }
+
+    def append(self, df_order_details, df_orders, version=None):
+        """
+        A new engine with typed (and validated) orders and order details
+        added, under the given version (by default one counting the rows).
+        The new lines are joined against their orders through the order
+        index, put in the fact table, its time index and the raw table
+        sort orders at their time, rolled up on their own and merged into
+        the cube and the baskets, and only the days they fall on are
+        sketched again. Nothing in the history is joined, sorted or
+        aggregated again. This engine is left untouched for the sessions
+        still reading it.
+
+        Details of orders outside the months this engine loaded are left
+        out, they only matter to the engines over those months.
+        """
+        engine = copy.copy(self)
+        df_orders = timeindex.sort_by_time(df_orders.assign(datetime=pd.to_datetime(df_orders["timestamp"], unit="s")),
+                                           "timestamp")
+        engine.df_orders, order_rows = timeindex.insert_rows(self.df_orders, df_orders, "timestamp")
+        engine.order_index = self.order_index.insert(df_orders)
+        df_order_details = df_order_details[engine.order_index.find(df_order_details["order_id"]) >= 0]
+        engine.df_order_details = pd.concat([self.df_order_details, df_order_details], ignore_index=True)
+        # the batch's orders and the older ones its late lines belong to
+        line_orders = storage.type_orders(engine.order_index.orders(df_order_details["order_id"]))
+        df_order_lines = facts.build_order_lines(df_order_details, line_orders, self.df_pizza_types, self.df_pizzas)
+        engine.df_order_lines, line_rows = timeindex.insert_rows(self.df_order_lines, df_order_lines)
+        engine.line_index = self.line_index.insert(df_order_lines["datetime"], line_rows)
+        engine.raw_tables = dict(self.raw_tables,
+                                 orders=self.raw_tables["orders"].insert(engine.df_orders[["order_id", "datetime"]],
+                                                                         order_rows),
+                                 order_details=self.raw_tables["order_details"].insert(
+                                     engine.df_order_lines[list(self.raw_tables["order_details"].df.columns)], line_rows))
+        if len(df_orders) or len(df_order_lines):
+            engine.cube = self.cube.merge(cube.RollupCube.build(df_order_lines, df_orders, self.df_pizza_dims))
+            engine.period_totals = self.period_totals \
+                .add(df_orders["day"], np.ones(len(df_orders), dtype="int64"), np.zeros(len(df_orders))) \
+                .add(df_order_lines["day"], np.zeros(len(df_order_lines), dtype="int64"), df_order_lines["revenue"])
+        # a new version drops the cached results of the old one, and the views
+        engine.views = None
+        if version is None:
+            version = "{}+{}.{}".format(str(self.version).split("+")[0], len(engine.df_orders), len(engine.df_order_lines))
+        engine.version = version
+        engine.baskets = self.baskets.append(df_order_lines)
+        if len(df_order_lines):
+            # lines can join orders already sketched, so their days are sketched again
+            days = np.unique(df_order_lines["day"].to_numpy())
+            day_lines = engine.df_order_lines.iloc[engine.line_index.day_rows(days)]
+            day_sketches = sketches.build_order_sketches(day_lines)
+            engine.order_sketches = {value: self.order_sketches[value].replace(day_sketches[value])
+                                     for value in self.order_sketches}
+        return engine
+
+    @classmethod
+    def load(cls, data_dir=storage.DATA_DIR, results=None, start=None, end=None):
+        """
+        engine over the snapshot of data_dir, rebuilding it if needed, and
+        given a date range over only the months overlapping it. Views
+        materialized for this snapshot are served as they are.
+        """
+        tables = storage.load_snapshot(data_dir, start, end)
+        version = storage.snapshot_version(data_dir)
+        return cls(*tables, version=version, results=results,
+                   views=views.Views.read(views.views_path(data_dir), version))
+
+    @property
+    def first_date(self):
+        return self.cube.first_day.astype(object)
+
+    @property
+    def last_date(self):
+        return (self.cube.first_day + self.cube.n_days - 1).astype(object)
+
+    def order_lines(self, start, end):
+        """the order lines within the range, a zero copy slice of the fact table"""
+        return self.line_index.take(self.df_order_lines, start, end)
+
+    def n_lines(self, start, end):
+        """number of order lines in the range"""
+        rows = self.line_index.rows(start, end)
+        return rows.stop - rows.start
+
+    @_cached_latest
+    def period_kpis(self, period="month"):
+        """orders and revenue of the latest day, week or month against the one before"""
+        return self.period_totals.current(period)
+
+    # orders
+    @_cached
+    def order_kpis(self, start, end):
+        return {"total_orders": self.cube.total_orders(start, end)}
+
+    @_cached
+    def orders_by_period(self, start, end, period):
+        orders_per_day = self.cube.orders_per_day(start, end)
+        return self.cube.series(orders_per_day, period, start, end).rename("Number of Orders").to_frame().reset_index()
+
+    @_cached
+    def orders_timeline(self, start, end, max_points=charts.MAX_POINTS):
+        """orders over the range at an hour, day or week granularity, at most max_points points"""
+        days = self.cube.days(start, end)
+        step, df = charts.timeline(self.cube.dates[days], self.cube.orders_per_day_hour(start, end), max_points)
+        return step, df.rename(columns={"value": "Number of Orders"})
+
+    @_cached
+    def orders_by_hour(self, start, end):
+        """total and average per day orders for every hour"""
+        df_orders_by_hour = pd.DataFrame()
+        df_orders_by_hour["Hour"] = np.arange(24)
+        df_orders_by_hour["Orders"] = self.cube.orders_per_hour(start, end)
+        days_range = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+        df_orders_by_hour["Average"] = df_orders_by_hour["Orders"] / days_range
+        return df_orders_by_hour
+
+    @_cached
+    def basket_stats(self, start, end):
+        """pizzas per order"""
+        summary = self.order_sketches["quantity"].summary(start, end)
+        if not summary["count"]:
+            # no orders in the range
+            return {"mean": summary["mean"], "max": None, "min": None}
+        return {"mean": summary["mean"], "max": int(summary["max"]), "min": int(summary["min"])}
+
+    @_cached
+    def order_quantiles(self, start, end, value):
+        """p50, p90 and p99 of the order value (revenue) or pizzas per order (quantity)"""
+        estimates = self.order_sketches[value].quantiles(start, end, sketches.QUANTILES)
+        return {"p{:g}".format(q * 100): float(estimate) for q, estimate in zip(sketches.QUANTILES, estimates)}
+
+    @_cached
+    def order_histogram(self, start, end, value, bins=20):
+        """orders by order value (revenue) or pizzas per order (quantity), in bins"""
+        return self.order_sketches[value].histogram(start, end, bins)
+
+    @_cached
+    def basket_pairs(self, start, end, level="name", top=20):
+        """pairs of pizzas (name) or pizzas and sizes (pizza_id) most often ordered together"""
+        return self.baskets.pairs(start, end, level, top)
+
+    @_cached
+    def bought_with(self, start, end, member, level="name", top=10):
+        """pizzas most often in the same order as member"""
+        return self.baskets.bought_with(start, end, member, level, top)
+
+    # sales
+    @_cached
+    def sales_kpis(self, start, end):
+        order_price = self.order_sketches["revenue"].summary(start, end)
+        return {"total_sales": round(self.cube.total_revenue(start, end), 2),
+                "mean_order": round(order_price["mean"], 2),
+                "max_order": round(order_price["max"], 2),
+                "min_order": round(order_price["min"], 2)}
+
+    @_cached
+    def sales_by_period(self, start, end, period):
+        sales_per_day = self.cube.revenue_per_day(start, end)
+        return self.cube.series(sales_per_day, period, start, end).rename("Sales").to_frame().reset_index()
+
+    @_cached
+    def sales_timeline(self, start, end, max_points=charts.MAX_POINTS):
+        """sales over the range at an hour, day or week granularity, at most max_points points"""
+        days = self.cube.days(start, end)
+        step, df = charts.timeline(self.cube.dates[days], self.cube.revenue_per_day_hour(start, end), max_points)
+        return step, df.rename(columns={"value": "Sales"})
+
+    # best sellers
+    @_cached
+    def best_sellers(self, start, end, by, value):
+        """quantity or revenue by name, pizza_id, category, size or ingredients"""
+        if by == "ingredients":
+            df_type = self.cube.best_sellers("pizza_type_id", value, start, end)
+            df = self.ingredient_matrix.totals(df_type["pizza_type_id"], df_type[value], value)
+        else:
+            df = self.cube.best_sellers(by, value, start, end)
+        return df.sort_values(by=[value], ascending=False).rename(columns = COLUMNS)
+
+    # seasonality
+    @_cached
+    def seasonality(self, start, end, by=None):
+        """
+        weekly decomposition of the daily sales, in total or one series per
+        category, size or pizza name, as a long frame (Date, Series, observed,
+        trend, seasonal, resid, model)
+        """
+        df_sales = self.sales_by_period(start, end, "day")
+        if by is None:
+            series = {"Total": df_sales["Sales"].to_numpy()}
+        else:
+            matrix, members = self.cube.per_day_by(by, "revenue", start, end)
+            # same days as the total, the ones the shop was open
+            matrix = matrix[self.cube.revenue_per_day(start, end) > 0]
+            series = {member: matrix[:, i] for i, member in enumerate(members)}
+        return seasonality.to_frame(df_sales["Date"], seasonality.decompose_many(series))
+
+    def report_sections(self, start, end):
+        """every section of the report for the range, keyed by name, as calls that compute it"""
+        sections = {
+            "order_kpis": functools.partial(self.order_kpis, start, end),
+            "sales_kpis": functools.partial(self.sales_kpis, start, end),
+            "basket_stats": functools.partial(self.basket_stats, start, end),
+            "basket_pairs": functools.partial(self.basket_pairs, start, end),
+            "orders_by_hour": functools.partial(self.orders_by_hour, start, end),
+        }
+        for period in PERIODS:
+            sections["orders_by_" + period] = functools.partial(self.orders_by_period, start, end, period)
+            sections["sales_by_" + period] = functools.partial(self.sales_by_period, start, end, period)
+        for value in VALUES:
+            for by in DIMENSIONS:
+                sections["best_sellers_{}_{}".format(by, value)] = functools.partial(self.best_sellers, start, end, by, value)
+            sections["order_quantiles_" + value] = functools.partial(self.order_quantiles, start, end, value)
+            sections["order_histogram_" + value] = functools.partial(self.order_histogram, start, end, value)
+        if (pd.Timestamp(end) - pd.Timestamp(start)).days >= 14:
+            sections["seasonality"] = functools.partial(self.seasonality, start, end)
+        return sections
+
+    def report(self, start, end, only=None):
+        """every result for the range (or the sections named in only), keyed by section name"""
+        sections = self.report_sections(start, end)
+        if only is not None:
+            sections = {name: sections[name] for name in only}
+        return {name: section() for name, section in sections.items()}
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Baskets
+
+Sparse order x pizza incidence matrix built from the time sorted order
+lines, one row per order in time order, so a date range is a contiguous
+block of rows like it is for the lines. Pair co-occurrence is one sparse
+product of the block with itself, support, confidence and lift follow
+from it and the diagonal, no loop over pairs of pizzas.
+
+Pizzas are counted once per order, whatever the quantity. Baskets are
+by pizza_id (pizza and size) or by name (pizza type).
+
+New order lines are added to the matrices as they are: lines of known
+orders set entries in their rows, new orders get new rows, and the
+history is never read again.
+"""
+
+# import libraries
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from pizza_place import timeindex
+
+
+LEVELS = ["name", "pizza_id"]
+
+
+def _incidence(rows, columns, shape):
+    """binary csr matrix with ones at (rows, columns)"""
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype="int32"), (rows, columns)), shape=shape)
+    # two lines of the same pizza (or two sizes of a type) count once
+    matrix.data[:] = 1
+    return matrix
+
+
+def _orders(df_order_lines):
+    """row of every line among the orders in it (numbered as they show up), their ids and times"""
+    line_orders, order_ids = pd.factorize(df_order_lines["order_id"])
+    # every line of an order has the order's time
+    seconds = np.zeros(len(order_ids), dtype="datetime64[s]")
+    seconds[line_orders] = df_order_lines["datetime"].to_numpy().astype("datetime64[s]")
+    return line_orders, np.asarray(order_ids), seconds
+
+
+class BasketMatrix:
+    """rows are orders in time order, columns are pizzas or pizza types"""
+
+    def __init__(self, order_ids, seconds, matrices):
+        # id and time of the order in every row
+        self.order_ids = order_ids
+        self.index = timeindex.TimeIndex(seconds)
+        # {level: (members, orders x members csr matrix)}
+        self.matrices = matrices
+
+    @classmethod
+    def build(cls, df_order_lines):
+        """baskets of time sorted order lines (see facts.build_order_lines)"""
+        # orders are numbered as they first show up, which is in time order
+        line_orders, order_ids, seconds = _orders(df_order_lines)
+        matrices = {}
+        for level in LEVELS:
+            members = df_order_lines[level].cat
+            matrices[level] = (pd.Index(members.categories),
+                               _incidence(line_orders, members.codes.to_numpy(), (len(order_ids), len(members.categories))))
+        return cls(order_ids, seconds, matrices)
+
+    def append(self, df_order_lines):
+        """
+        New baskets with the order lines (of the same pizza dimensions)
+        added, to the rows of orders already in them or in rows of their
+        own. These baskets are left untouched.
+        """
+        if not len(df_order_lines):
+            return self
+        rows = self._rows(df_order_lines)
+        known = rows >= 0
+        line_orders, order_ids, seconds = _orders(df_order_lines[~known])
+        n_known, n_new = len(self.order_ids), len(order_ids)
+        # orders that came in late go in at their time, after the rows of the same time
+        at = np.searchsorted(self.index.seconds, seconds, side="right")
+        late = n_new and at[0] < n_known
+        if late:
+            order = np.insert(np.arange(n_known), at, n_known + np.arange(n_new))
+        matrices = {}
+        for level in LEVELS:
+            members, matrix = self.matrices[level]
+            codes = df_order_lines[level].cat.codes.to_numpy()
+            if known.any():
+                matrix = matrix + _incidence(rows[known], codes[known], matrix.shape)
+                matrix.data[:] = 1
+            new = _incidence(line_orders, codes[~known], (n_new, len(members)))
+            matrix = sparse.vstack([matrix, new], format="csr")
+            matrices[level] = (members, matrix[order] if late else matrix)
+        return BasketMatrix(np.insert(self.order_ids, at, order_ids), np.insert(self.index.seconds, at, seconds), matrices)
+
+    def _rows(self, df_order_lines):
+        """row of every line's order, -1 for orders not in the baskets yet"""
+        # a line has its order's time, so only the few orders of that second are compared
+        seconds = df_order_lines["datetime"].to_numpy().astype("datetime64[s]")
+        order_ids = df_order_lines["order_id"].to_numpy()
+        lo = np.searchsorted(self.index.seconds, seconds, side="left")
+        hi = np.searchsorted(self.index.seconds, seconds, side="right")
+        rows = np.full(len(seconds), -1)
+        for step in range(int((hi - lo).max()) if len(seconds) else 0):
+            at = np.minimum(lo + step, len(self.order_ids) - 1)
+            found = (lo + step < hi) & (self.order_ids[at] == order_ids)
+            rows[found] = at[found]
+        return rows
+
+    def cooccurrence(self, start, end, level="name"):
+        """
+        The members, a dense members x members array of the orders holding
+        both (the diagonal is the orders holding each) and the number of
+        orders in the range.
+        """
+        members, matrix = self.matrices[level]
+        block = matrix[self.index.rows(start, end)]
+        return members, (block.T @ block).toarray().astype("int64"), block.shape[0]
+
+    def pairs(self, start, end, level="name", top=20):
+        """
+        The top pairs of members by orders holding both, with support
+        (share of orders holding both), confidence both ways and lift.
+        """
+        members, counts, n_orders = self.cooccurrence(start, end, level)
+        first, second = np.triu_indices(len(members), k=1)
+        both = counts[first, second]
+        keep = both > 0
+        first, second, both = first[keep], second[keep], both[keep]
+        # most orders first, the stronger affinity breaks ties
+        lift = both * n_orders / (counts[first, first] * counts[second, second])
+        order = np.lexsort((-lift, -both))[:top]
+        first, second, both, lift = first[order], second[order], both[order], lift[order]
+        return pd.DataFrame({
+            "Pizza": members[first],
+            "With": members[second],
+            "Orders": both,
+            "Support": both / n_orders,
+            "Confidence": both / counts[first, first],
+            "Reverse Confidence": both / counts[second, second],
+            "Lift": lift,
+        })
+
+    def bought_with(self, start, end, member, level="name", top=10):
+        """
+        The members most often in the same order as member, with the share
+        of member's orders they are in (confidence) and lift.
+        """
+        members, counts, n_orders = self.cooccurrence(start, end, level)
+        i = members.get_loc(member)
+        ordered = np.diag(counts)
+        both = counts[i].copy()
+        both[i] = 0
+        others = np.flatnonzero(both)
+        lift = both[others] * n_orders / (ordered[i] * ordered[others])
+        order = np.lexsort((-lift, -both[others]))[:top]
+        others = others[order]
+        return pd.DataFrame({
+            "With": members[others],
+            "Orders": both[others],
+            "Confidence": both[others] / ordered[i],
+            "Lift": lift[order],
+        })
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Benchmarks
+
+Times and memory profiles every stage of the pipeline (snapshot build,
+csv read, full and one month loads, timestamp parsing, joins, date
+filter, each tab's aggregation, order sketches, baskets, ingredients and
+the seasonal decomposition) on synthetic data at several scales and
+emits a machine readable report so regressions can be tracked.
+
+Memory is the peak traced by tracemalloc (python and numpy allocations)
+and, separately, the peak held by Arrow's memory pool, which tracemalloc
+does not see: csv parsing, snapshot writes and loads all allocate there.
+
+    python -m pizza_place bench --scales 1 10 100 --out bench.json
+"""
+
+# import libraries
+import datetime
+import os
+import platform
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+import pyarrow as pa
+
+from pizza_place import analytics, basket, cache, cube, facts, sketches, storage, synthetic
+
+
+def arrow_peak(func, interval=0.001):
+    """
+    peak bytes the arrow memory pool held above its start while func ran,
+    sampled every interval seconds and once more with the result still held
+    """
+    base = pa.total_allocated_bytes()
+    peak = [base]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            peak[0] = max(peak[0], pa.total_allocated_bytes())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        result = func()
+        peak[0] = max(peak[0], pa.total_allocated_bytes())
+        del result
+    finally:
+        done.set()
+        sampler.join()
+    return peak[0] - base
+
+
+def measure(func, repeat=3):
+    """
+    best wall time over repeat runs, then the peak arrow pool memory and
+    the peak traced memory of one more run each
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+
+    arrow = arrow_peak(func)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(seconds), peak, arrow
+
+
+def stages(data_dir):
+    """(name, function, rows processed) for every benchmarked stage"""
+    storage.build_snapshot(data_dir)
+    tables = storage.load_snapshot(data_dir)
+    df_order_details, df_orders, df_pizza_types, df_pizzas = tables
+    # nothing is cached so every call does the full computation
+    engine = analytics.Analytics(*[df.copy() for df in tables], version="bench",
+                                 results=cache.ResultCache(maxsize=0))
+    start, end = engine.first_date, engine.last_date
+    month_end = min(start + datetime.timedelta(days=30), end)
+    n_lines = len(engine.df_order_lines)
+    raw_orders = pd.read_csv(os.path.join(data_dir, "orders.csv"), dtype={"date": str, "time": str})
+
+    yield "snapshot_build", lambda: storage.build_snapshot(data_dir), n_lines
+    yield "read_csv", lambda: storage.read_csv_tables(data_dir), n_lines
+    yield "load", lambda: storage.load_snapshot(data_dir), n_lines
+    yield "load_month", lambda: storage.load_snapshot(data_dir, start, month_end), n_lines
+    yield "datetime_build", lambda: storage.parse_timestamps(raw_orders["date"], raw_orders["time"]), len(raw_orders)
+    yield "joins", lambda: facts.build_order_lines(*tables), n_lines
+    yield "cube_build", lambda: cube.RollupCube.build(engine.df_order_lines, engine.df_orders, engine.df_pizza_dims), n_lines
+    yield "date_filter", lambda: len(engine.order_lines(start, month_end)), n_lines
+    for period in analytics.PERIODS:
+        yield "orders_by_" + period, lambda period=period: engine.orders_by_period(start, end, period), n_lines
+        yield "sales_by_" + period, lambda period=period: engine.sales_by_period(start, end, period), n_lines
+    yield "orders_timeline", lambda: engine.orders_timeline(start, end), n_lines
+    yield "sales_timeline", lambda: engine.sales_timeline(start, end), n_lines
+    yield "orders_by_hour", lambda: engine.orders_by_hour(start, end), n_lines
+    yield "order_kpis", lambda: engine.order_kpis(start, end), n_lines
+    yield "sales_kpis", lambda: engine.sales_kpis(start, end), n_lines
+    yield "basket_stats", lambda: engine.basket_stats(start, end), n_lines
+    yield "sketch_build", lambda: sketches.build_order_sketches(engine.df_order_lines), n_lines
+    for value in analytics.VALUES:
+        yield "quantiles_" + value, lambda value=value: engine.order_quantiles(start, end, value), n_lines
+    yield "basket_build", lambda: basket.BasketMatrix.build(engine.df_order_lines), n_lines
+    for level in basket.LEVELS:
+        yield "basket_pairs_" + level, lambda level=level: engine.basket_pairs(start, end, level), n_lines
+    for by in ["name", "pizza_id", "category", "size"]:
+        yield "best_sellers_" + by, lambda by=by: engine.best_sellers(start, end, by, "revenue"), n_lines
+    yield "ingredients", lambda: engine.best_sellers(start, end, "ingredients", "revenue"), n_lines
+    for by in analytics.SEASONAL_GROUPS:
+        yield "seasonality_" + (by or "total"), lambda by=by: engine.seasonality(start, end, by), n_lines
+
+
+def run(scales, repeat=3, seed=0, work_dir=None, log=None):
+    """benchmark every stage at every scale, returns the report as a dict"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            data_dir = os.path.join(work_dir or tmp, "x{:g}".format(scale))
+            # generated data is reused when a work dir is given
+            if not os.path.exists(os.path.join(data_dir, "orders.csv")):
+                synthetic.generate(data_dir, scale=scale, seed=seed)
+            for stage, func, rows in stages(data_dir):
+                seconds, peak, arrow = measure(func, repeat)
+                results.append({"scale": scale, "stage": stage, "seconds": seconds,
+                                "peak_bytes": peak, "arrow_peak_bytes": arrow, "rows": rows})
+                if log is not None:
+                    log("x{:<6g} {:<22} {:>10.4f}s {:>12,d} B {:>12,d} B arrow".format(scale, stage, seconds, peak, arrow))
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "seed": seed,
+        "repeat": repeat,
+        "results": results,
+    }
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Raw Data Browser
+
+Paging, sorting and filtering of the raw tables on the server, so only
+the page being looked at is sent to the browser.
+
+Every filterable or sortable column gets a sort order the first time it
+is used (built once and shared by every session). A range or "one of"
+filter is then a few binary searches into it, and a page is a slice of
+it. Only the smallest match is gathered, the other filters are checked
+on its rows and filters every row passes are skipped, so the cost of a
+page grows with the rows that match the filters, not with the size of
+the table.
+"""
+
+# import libraries
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+class TableBrowser:
+    """
+    Read only paged view of one table. Filters are {column: (low, high)}
+    for inclusive ranges (either end may be None) or {column: [values]}
+    for membership.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.df)
+
+    def _key(self, column, rows=None):
+        """column (or the rows of it) as sortable numbers, categoricals by their label"""
+        values = self.df[column] if rows is None else self.df[column].iloc[rows]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            label_rank = np.argsort(np.argsort(np.asarray(values.cat.categories)))
+            return label_rank[values.cat.codes.to_numpy()]
+        if np.issubdtype(values.dtype, np.datetime64):
+            return values.to_numpy().astype("datetime64[ns]").astype("int64")
+        return values.to_numpy()
+
+    def _to_key(self, column, values):
+        """filter values in the column's key space"""
+        dtype = self.df[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            label_rank = np.argsort(np.argsort(np.asarray(dtype.categories)))
+            codes = dtype.categories.get_indexer(values)
+            return label_rank[codes[codes >= 0]]
+        if np.issubdtype(dtype, np.datetime64):
+            return pd.to_datetime(values).to_numpy().astype("datetime64[ns]").astype("int64")
+        values = np.asarray(values)
+        if np.issubdtype(dtype, np.integer) and np.issubdtype(values.dtype, np.integer):
+            # searched as the keys' own type, or numpy converts every key on each search
+            info = np.iinfo(dtype)
+            return np.clip(values, info.min, info.max).astype(dtype)
+        return values
+
+    def sort_order(self, column):
+        """
+        rows in (stable) order of column, the column's keys in that order
+        and every row's rank in it
+        """
+        if column not in self._orders:
+            key = self._key(column)
+            order = np.argsort(key, kind="mergesort")
+            rank = np.empty(len(order), dtype="int64")
+            rank[order] = np.arange(len(order))
+            with self._lock:
+                self._orders.setdefault(column, (order, key[order], rank))
+        return self._orders[column]
+
+    def insert(self, df, rows):
+        """
+        Browser over df, this browser's table with new rows at row numbers
+        rows. The sort orders built so far are carried over with the new
+        rows merged in, nothing is sorted again but the new rows.
+        """
+        table = TableBrowser(df)
+        # where every old row went
+        old_rows = np.delete(np.arange(len(df)), rows)
+        for column, (order, keys, _) in list(self._orders.items()):
+            new_keys = table._key(column, rows)
+            new_order = np.argsort(new_keys, kind="mergesort")
+            new_keys, new_rows = new_keys[new_order], rows[new_order]
+            order = old_rows[order]
+            lo = np.searchsorted(keys, new_keys, side="left")
+            hi = np.searchsorted(keys, new_keys, side="right")
+            # equal keys stay in row order, a new row goes among them by its row number
+            at, tie = lo.copy(), np.flatnonzero(hi > lo)
+            if len(tie) > 64:
+                # number the runs of equal keys once, (run, row) pairs are sorted too
+                run = np.zeros(len(keys), dtype="int64")
+                run[1:] = np.cumsum(keys[1:] != keys[:-1])
+                at[tie] = np.searchsorted(run * len(df) + order, run[lo[tie]] * len(df) + new_rows[tie])
+            else:
+                for i in tie:
+                    at[i] = lo[i] + np.searchsorted(order[lo[i]:hi[i]], new_rows[i])
+            order = np.insert(order, at, new_rows)
+            rank = np.empty(len(order), dtype="int64")
+            rank[order] = np.arange(len(order))
+            table._orders[column] = (order, np.insert(keys, at, new_keys), rank)
+        return table
+
+    def _spans(self, column, condition):
+        """[lo, hi) spans of the column's sort order holding the rows that match one filter, in order"""
+        _, keys, _ = self.sort_order(column)
+        if isinstance(condition, tuple):
+            low, high = condition
+            lo = 0 if low is None else np.searchsorted(keys, self._to_key(column, [low])[0], side="left")
+            hi = len(keys) if high is None else np.searchsorted(keys, self._to_key(column, [high])[0], side="right")
+            return np.array([lo]), np.array([max(hi, lo)])
+        wanted = np.unique(self._to_key(column, list(condition)))
+        return np.searchsorted(keys, wanted, side="left"), np.searchsorted(keys, wanted, side="right")
+
+    def select(self, filters=None):
+        """sorted row numbers matching every filter, None for all rows"""
+        spans = {}
+        for column, condition in (filters or {}).items():
+            lo, hi = self._spans(column, condition)
+            # a filter every row passes, like the default date range, is left out
+            if (hi - lo).sum() < len(self.df):
+                spans[column] = lo, hi
+        if not spans:
+            return None
+        # only the rows of the smallest match are gathered and sorted
+        smallest = min(spans, key=lambda column: (spans[column][1] - spans[column][0]).sum())
+        order = self.sort_order(smallest)[0]
+        lo, hi = spans.pop(smallest)
+        rows = np.sort(np.concatenate([order[l:h] for l, h in zip(lo, hi)] + [order[:0]]))
+        for column, (lo, hi) in spans.items():
+            # the other filters are checked on those rows by their rank in the column's order
+            rank = self.sort_order(column)[2][rows]
+            at = np.searchsorted(lo, rank, side="right") - 1
+            rows = rows[(at >= 0) & (rank < hi[np.maximum(at, 0)])] if len(lo) else rows[:0]
+        return rows
+
+    def page(self, filters=None, sort_by=None, ascending=True, page=0, page_size=50):
+        """one page of rows, and the number of rows matching the filters"""
+        rows = self.select(filters)
+        n_rows = len(self.df) if rows is None else len(rows)
+        # a descending page is the matching ascending slice from the end, reversed
+        if ascending:
+            first, last = page * page_size, min((page + 1) * page_size, n_rows)
+        else:
+            first, last = max(n_rows - (page + 1) * page_size, 0), max(n_rows - page * page_size, 0)
+
+        if sort_by is None:
+            taken = np.arange(first, last) if rows is None else rows[first:last]
+        elif rows is None:
+            taken = self.sort_order(sort_by)[0][first:last]
+        else:
+            rank = self.sort_order(sort_by)[2]
+            taken = rows[np.argsort(rank[rows], kind="mergesort")][first:last]
+        if not ascending:
+            taken = taken[::-1]
+        return self.df.iloc[taken], n_rows
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Result Cache
+
+Process wide LRU cache for the page level results (KPIs, per period
+tables, best sellers, seasonal decomposition). Entries are keyed by
+(name, dataset version, start date, end date), so switching tabs or ticking
+a checkbox reuses what was computed for the current date range, and
+popular ranges are shared by every session.
+"""
+
+# import libraries
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Bounded LRU cache with hit/miss counters.
+
+    Cached values are shared between sessions, so callers must treat them
+    as read only. Whenever a lookup comes in with a new dataset version the
+    entries of the old version are dropped.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # hits served by the materialized views, never stored here
+        self.view_hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # per thread counts, every session reruns its script on its own thread
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, name, version, start, end, compute):
+        """cached compute(start, end), computing it on a miss"""
+        key = (name, version, start, end)
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._local.hits = getattr(self._local, "hits", 0) + 1
+                return self._entries[key]
+            self.misses += 1
+            self._local.misses = getattr(self._local, "misses", 0) + 1
+
+        # compute outside the lock so other sessions are not blocked
+        value = compute(start, end)
+
+        with self._lock:
+            if version == self.version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def count_view_hit(self):
+        """count a result served by the materialized views as a hit"""
+        with self._lock:
+            self.hits += 1
+            self.view_hits += 1
+            self._local.hits = getattr(self._local, "hits", 0) + 1
+
+    def invalidate(self):
+        """drop every entry, e.g. after the snapshot was rebuilt"""
+        with self._lock:
+            self._entries.clear()
+            self.version = None
+
+    def thread_stats(self):
+        """hits and misses of the calling thread"""
+        return getattr(self._local, "hits", 0), getattr(self._local, "misses", 0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "view_hits": self.view_hits,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+# one cache per process
+RESULTS = ResultCache()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Chart Data
+
+Bounds what a time series chart sends to the browser. The granularity
+(hour, day or week) is picked from the length of the range so a chart
+has at most max_points points, and anything still over the cap is
+downsampled with largest triangle three buckets (LTTB), which keeps the
+peaks and dips a plain resample would average away.
+"""
+
+# import libraries
+import numpy as np
+import pandas as pd
+
+
+# about one point per pixel of a full width chart
+MAX_POINTS = 1000
+GRANULARITIES = ["hour", "day", "week"]
+
+
+def granularity(n_days, max_points=MAX_POINTS):
+    """the finest of hour, day and week that fits n_days into max_points"""
+    if n_days * 24 <= max_points:
+        return "hour"
+    if n_days <= max_points:
+        return "day"
+    return "week"
+
+
+def lttb(x, y, n):
+    """indices of the n points of (x, y) that LTTB keeps, first and last included"""
+    size = len(y)
+    if n >= size or n < 3:
+        return np.arange(size)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    # n - 2 buckets between the fixed first and last point
+    edges = np.linspace(1, size - 1, n - 1).astype("int64")
+    keep = np.empty(n, dtype="int64")
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # average of the next bucket (or the last point) is the third corner
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else size
+        cx, cy = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def timeline(dates, per_hour, max_points=MAX_POINTS):
+    """
+    Roll a days x 24 array of values up to the granularity that fits
+    max_points and downsample what is still over. Returns the granularity
+    and a frame of Date and value. Days and weeks without any activity
+    are dropped like the per day tabs do, hours are kept so the nights
+    show as closed.
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    per_hour = np.asarray(per_hour)
+    step = granularity(len(dates), max_points)
+    if step == "hour":
+        x = (dates[:, None] + np.arange(24).astype("timedelta64[h]")).ravel()
+        y = per_hour.ravel()
+    else:
+        per_day = per_hour.sum(axis=1)
+        if step == "day":
+            x, y = dates, per_day
+        else:
+            # weeks start on monday, 1970-01-01 was a thursday
+            week_start = dates - ((dates.astype("int64") + 3) % 7).astype("timedelta64[D]")
+            x, inverse = np.unique(week_start, return_inverse=True)
+            y = np.bincount(inverse, weights=per_day, minlength=len(x))
+        active = y > 0
+        x, y = x[active], y[active]
+
+    if np.issubdtype(per_hour.dtype, np.integer):
+        y = np.round(y).astype("int64")
+    keep = lttb(x.astype("datetime64[s]").astype("int64"), y, max_points)
+    return step, pd.DataFrame({"Date": x[keep].astype("datetime64[ns]"), "value": y[keep]})
+
+
+def downsample(df, x, y, by=None, max_points=MAX_POINTS):
+    """LTTB every series (rows sharing a by value) of a long frame to at most max_points points"""
+    groups = [df] if by is None else [group for _, group in df.groupby(by, sort=False)]
+    keep = []
+    for group in groups:
+        # lttb needs every point, gaps in y would break the triangles
+        group = group[group[y].notna()]
+        stamps = pd.to_datetime(group[x]).to_numpy().astype("int64")
+        keep.append(group.index[lttb(stamps, group[y].to_numpy(), max_points)])
+    return df.loc[np.concatenate(keep) if keep else []]
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place CLI
+
+Prints or exports the analytics for a date range without a browser
+session, e.g. for nightly batch reports:
+
+    python -m pizza_place report --start 2015-01-01 --end 2015-03-31
+    python -m pizza_place report --format csv --out reports/
+    python -m pizza_place materialize
+"""
+
+# import libraries
+import argparse
+import json
+import os
+import sys
+
+import pandas as pd
+
+from pizza_place import analytics, bench, cache, ingest, loadtest, startup, storage, synthetic, views
+
+
+def _date(value):
+    return pd.Timestamp(value).date()
+
+
+def _jsonable(value):
+    if isinstance(value, pd.DataFrame):
+        return json.loads(value.to_json(orient="records", date_format="iso"))
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    # ranges without orders have no mean or percentiles, null in json
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def write_report(sections, fmt, out=None, stream=sys.stdout):
+    """write the report sections as one json document or one csv per section"""
+    if fmt == "json":
+        document = {name: _jsonable(value) for name, value in sections.items()}
+        if out is None:
+            json.dump(document, stream, indent=2)
+            stream.write("\n")
+        else:
+            os.makedirs(out, exist_ok=True)
+            with open(os.path.join(out, "report.json"), "w") as f:
+                json.dump(document, f, indent=2)
+        return
+
+    os.makedirs(out, exist_ok=True)
+    for name, value in sections.items():
+        df = value if isinstance(value, pd.DataFrame) else pd.DataFrame([value])
+        df.to_csv(os.path.join(out, name + ".csv"), index=False)
+
+
+def report(args):
+    # the months of the range, the latest one when the range has no data (like the pages)
+    storage.ensure_snapshot(args.data_dir)
+    first_month, last_month = storage.window(args.start, args.end, args.data_dir)
+    engine = ingest.Live.load(args.data_dir, start=first_month, end=last_month).engine
+    start = args.start or engine.first_date
+    end = args.end or engine.last_date
+    if args.only:
+        unknown = set(args.only) - set(engine.report_sections(start, end))
+        if unknown:
+            raise SystemExit("unknown sections: " + ", ".join(sorted(unknown)))
+    # only the sections asked for are computed
+    write_report(engine.report(start, end, args.only or None), args.format, args.out)
+
+
+def materialize(args):
+    # computed from scratch, neither the result cache nor older views are reused
+    engine = analytics.Analytics.load(args.data_dir, results=cache.ResultCache(maxsize=0))
+    engine.views = None
+    ranges = views.standard_ranges(engine.first_date, engine.last_date)
+    built = views.Views.build(engine, ranges, analytics.page_views)
+    path = views.views_path(args.data_dir)
+    built.write(path)
+    print("wrote {:,d} results over {:,d} ranges to {}".format(len(built), len(ranges), path))
+
+
+def ingest_check(args):
+    live = ingest.Live.load(args.data_dir)
+    print("applied {orders:,d} orders and {order_details:,d} order details".format(**live.applied))
+    for error in live.errors:
+        print("rejected " + error)
+    if live.errors:
+        raise SystemExit(1)
+
+
+def synth(args):
+    counts = synthetic.generate(args.out, scale=args.scale, seed=args.seed, data_dir=args.data_dir)
+    print("wrote {orders:,d} orders and {order_details:,d} order lines over {years} years to ".format(**counts) + args.out)
+
+
+def benchmark(args):
+    log = lambda line: print(line, file=sys.stderr)
+    result = bench.run(args.scales, repeat=args.repeat, seed=args.seed, work_dir=args.work_dir, log=log)
+    if args.out is None:
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+def startup_profile(args):
+    result = startup.run(args.pages)
+    for page in result:
+        print("{page:<32} first paint {first_paint_seconds:6.2f}s = interpreter {interpreter_seconds:.2f}s"
+              " + imports {import_seconds:.2f}s + script {script_seconds:.2f}s".format(**page), file=sys.stderr)
+    if args.out is None:
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+def load_test(args):
+    log = lambda line: print(line, file=sys.stderr)
+    result = loadtest.run(args.sessions, reruns=args.reruns, seed=args.seed, data_dir=args.data_dir, log=log)
+    if args.out is None:
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pizza_place", description="Pizza Place analytics")
+    parser.add_argument("--data-dir", default=storage.DATA_DIR, help="folder with the pizza_sales csv files")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    report_parser = commands.add_parser("report", help="print or export the analytics for a date range")
+    report_parser.add_argument("--start", type=_date, help="first date (default: first day of data)")
+    report_parser.add_argument("--end", type=_date, help="last date, inclusive (default: last day of data)")
+    report_parser.add_argument("--format", choices=["json", "csv"], default="json")
+    report_parser.add_argument("--out", help="output folder (required for csv)")
+    report_parser.add_argument("--only", nargs="+", metavar="SECTION", help="only these report sections")
+    report_parser.set_defaults(func=report)
+
+    materialize_parser = commands.add_parser("materialize", help="precompute the pages for the full history, every month and quarter")
+    materialize_parser.set_defaults(func=materialize)
+
+    ingest_parser = commands.add_parser("ingest", help="check the rows appended to the csv files or spooled since the snapshot")
+    ingest_parser.set_defaults(func=ingest_check)
+
+    synth_parser = commands.add_parser("synth", help="write a synthetic dataset at a multiple of the source size")
+    synth_parser.add_argument("--scale", type=float, default=10, help="multiple of the source rows (default: 10)")
+    synth_parser.add_argument("--seed", type=int, default=0)
+    synth_parser.add_argument("--out", required=True, help="output folder")
+    synth_parser.set_defaults(func=synth)
+
+    bench_parser = commands.add_parser("bench", help="time and memory profile every stage at several scales")
+    bench_parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100])
+    bench_parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage, the best is kept")
+    bench_parser.add_argument("--seed", type=int, default=0)
+    bench_parser.add_argument("--work-dir", help="keep the generated datasets here instead of a temp folder")
+    bench_parser.add_argument("--out", help="write the json report here instead of stdout")
+    bench_parser.set_defaults(func=benchmark)
+
+    startup_parser = commands.add_parser("startup", help="cold start time of every page, split by import")
+    startup_parser.add_argument("--pages", nargs="+", metavar="PAGE", help="only these page scripts")
+    startup_parser.add_argument("--out", help="write the json report here instead of stdout")
+    startup_parser.set_defaults(func=startup_profile)
+
+    loadtest_parser = commands.add_parser("loadtest", help="rerun latency, throughput and memory as concurrent sessions grow")
+    loadtest_parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="concurrency levels")
+    loadtest_parser.add_argument("--reruns", type=int, default=20, help="reruns per session at every level")
+    loadtest_parser.add_argument("--seed", type=int, default=0)
+    loadtest_parser.add_argument("--out", help="write the json report here instead of stdout")
+    loadtest_parser.set_defaults(func=load_test)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "format", None) == "csv" and not args.out:
+        parser.error("--format csv needs --out")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Rollup Cube
+
+Pre-aggregates the fact table into (date, hour, pizza) cells so the page
+KPIs, the Day/Month/Quarter tabs, the hourly histogram and the best
+sellers are answered by summing a slice of the cube. The cost of a query
+grows with the number of days in the range, not the number of order rows.
+"""
+
+# import libraries
+import numpy as np
+import pandas as pd
+
+from pizza_place import facts
+
+
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July",
+               "August", "September", "October", "November", "December"]
+
+
+class RollupCube:
+    """
+    Order counts by (day, hour) and pizza quantity and revenue by
+    (day, hour, pizza).
+
+    Order counts are kept dense since there are only 24 cells a day. The
+    pizza cells are sparse, sorted by day, with day_offsets[d] pointing at
+    the first cell of day d so a date range is one contiguous slice.
+    """
+
+    def __init__(self, first_day, order_counts, cell_day, cell_hour, cell_pizza,
+                 cell_quantity, cell_revenue, df_pizza_dims):
+        self.first_day = np.datetime64(first_day, "D")
+        self.order_counts = order_counts
+        self.cell_day = cell_day
+        self.cell_hour = cell_hour
+        self.cell_pizza = cell_pizza
+        self.cell_quantity = cell_quantity
+        self.cell_revenue = cell_revenue
+        self.df_pizza_dims = df_pizza_dims
+        self.n_days = len(order_counts)
+        self.day_offsets = np.searchsorted(cell_day, np.arange(self.n_days + 1))
+        # calendar of every day in the cube
+        self.dates = self.first_day + np.arange(self.n_days)
+        months = self.dates.astype("datetime64[M]").astype("int64") % 12
+        self.day_month = months.astype("int8")
+        self.day_quarter = (months // 3 + 1).astype("int8")
+
+    @classmethod
+    def build(cls, df_order_lines, df_orders, df_pizza_dims):
+        """aggregate the fact table and the orders (by their calendar columns) into a cube"""
+        order_days = df_orders["day"].to_numpy().astype("int64")
+        # lines can come without their orders when they are appended later
+        all_days = np.concatenate([order_days, df_order_lines["day"].to_numpy().astype("int64")])
+        first_day = all_days.min()
+        n_days = int(all_days.max() - first_day) + 1
+
+        order_cells = (order_days - first_day) * 24 + df_orders["hour"].to_numpy()
+        order_counts = np.bincount(order_cells, minlength=n_days * 24).reshape(n_days, 24).astype("int32")
+
+        # one key per (day, hour, pizza) cell, sorted so days are contiguous
+        n_pizzas = len(df_pizza_dims)
+        line_days = df_order_lines["day"].to_numpy().astype("int64") - first_day
+        pizza = facts.pizza_rows(df_order_lines["pizza_id"], df_pizza_dims)
+        keys = (line_days * 24 + df_order_lines["hour"].to_numpy()) * n_pizzas + pizza
+        cells, inverse = np.unique(keys, return_inverse=True)
+        quantity = np.bincount(inverse, weights=df_order_lines["quantity"].to_numpy(), minlength=len(cells))
+        revenue = np.bincount(inverse, weights=df_order_lines["revenue"].to_numpy(), minlength=len(cells))
+
+        return cls(
+            np.datetime64(int(first_day), "D"),
+            order_counts,
+            (cells // (24 * n_pizzas)).astype("int32"),
+            (cells // n_pizzas % 24).astype("int8"),
+            (cells % n_pizzas).astype("int16"),
+            quantity.astype("int32"),
+            revenue,
+            df_pizza_dims,
+        )
+
+    def merge(self, other):
+        """
+        Cube of self and other (over the same pizzas). Only the cells of
+        the days other has cells on are added up again, the rest of self
+        is copied as it is, so merging in a few days (new ones or old ones
+        with late lines) costs about as much as those days, not the history.
+        """
+        first_day = min(self.first_day, other.first_day)
+        stop = max(self.first_day + self.n_days, other.first_day + other.n_days)
+        n_days = int((stop - first_day).astype("int64"))
+        shift_self = int((self.first_day - first_day).astype("int64"))
+        shift_other = int((other.first_day - first_day).astype("int64"))
+
+        order_counts = np.zeros((n_days, 24), dtype="int32")
+        order_counts[shift_self:shift_self + self.n_days] += self.order_counts
+        order_counts[shift_other:shift_other + other.n_days] += other.order_counts
+
+        n_pizzas = len(self.df_pizza_dims)
+        # cells of self on the days other has cells on
+        days = np.unique(other.cell_day).astype("int64") + shift_other - shift_self
+        days = days[(days >= 0) & (days < self.n_days)]
+        touched = np.concatenate([np.arange(self.day_offsets[day], self.day_offsets[day + 1]) for day in days]
+                                 + [np.zeros(0, dtype="int64")])
+        keep = np.ones(len(self.cell_day), dtype=bool)
+        keep[touched] = False
+
+        def keys(c, cells, shift):
+            return ((c.cell_day[cells].astype("int64") + shift) * 24 + c.cell_hour[cells]) * n_pizzas + c.cell_pizza[cells]
+
+        cells, inverse = np.unique(np.concatenate([keys(self, touched, shift_self), keys(other, slice(None), shift_other)]),
+                                   return_inverse=True)
+        quantity = np.bincount(inverse, weights=np.concatenate([self.cell_quantity[touched], other.cell_quantity]),
+                               minlength=len(cells))
+        revenue = np.bincount(inverse, weights=np.concatenate([self.cell_revenue[touched], other.cell_revenue]),
+                              minlength=len(cells))
+
+        # the summed days are not among the kept ones, they go in before the next kept day
+        cell_day = self.cell_day[keep].astype("int32") + shift_self
+        new_day = (cells // (24 * n_pizzas)).astype("int32")
+        at = np.searchsorted(cell_day, new_day)
+        return RollupCube(
+            first_day,
+            order_counts,
+            np.insert(cell_day, at, new_day),
+            np.insert(self.cell_hour[keep], at, (cells // n_pizzas % 24).astype("int8")),
+            np.insert(self.cell_pizza[keep], at, (cells % n_pizzas).astype("int16")),
+            np.insert(self.cell_quantity[keep], at, quantity.astype("int32")),
+            np.insert(self.cell_revenue[keep], at, revenue),
+            self.df_pizza_dims,
+        )
+
+    def days(self, start, end):
+        """day numbers covered by the inclusive date range [start, end]"""
+        first = int((np.datetime64(start, "D") - self.first_day).astype("int64"))
+        last = int((np.datetime64(end, "D") - self.first_day).astype("int64"))
+        return slice(min(max(first, 0), self.n_days), min(max(last + 1, 0), self.n_days))
+
+    def _cells(self, start, end):
+        days = self.days(start, end)
+        return slice(self.day_offsets[days.start], self.day_offsets[days.stop])
+
+    # orders
+    def orders_per_day(self, start, end):
+        return self.order_counts[self.days(start, end)].sum(axis=1)
+
+    def orders_per_hour(self, start, end):
+        return self.order_counts[self.days(start, end)].sum(axis=0)
+
+    def total_orders(self, start, end):
+        return int(self.order_counts[self.days(start, end)].sum())
+
+    def orders_per_day_hour(self, start, end):
+        """days x 24 order counts"""
+        return self.order_counts[self.days(start, end)]
+
+    # pizzas
+    def _per_day(self, values, start, end):
+        days = self.days(start, end)
+        cells = self._cells(start, end)
+        per_day = np.bincount(self.cell_day[cells] - days.start, weights=values[cells],
+                              minlength=days.stop - days.start)
+        return per_day
+
+    def quantity_per_day(self, start, end):
+        return self._per_day(self.cell_quantity, start, end)
+
+    def revenue_per_day(self, start, end):
+        return self._per_day(self.cell_revenue, start, end)
+
+    def revenue_per_day_hour(self, start, end):
+        """days x 24 revenue"""
+        days = self.days(start, end)
+        cells = self._cells(start, end)
+        keys = (self.cell_day[cells] - days.start).astype("int64") * 24 + self.cell_hour[cells]
+        n_days = days.stop - days.start
+        return np.bincount(keys, weights=self.cell_revenue[cells], minlength=n_days * 24).reshape(n_days, 24)
+
+    def total_quantity(self, start, end):
+        return int(self.cell_quantity[self._cells(start, end)].sum())
+
+    def total_revenue(self, start, end):
+        return float(self.cell_revenue[self._cells(start, end)].sum())
+
+    def per_pizza(self, value, start, end):
+        """quantity or revenue of every pizza in the range"""
+        values = self.cell_quantity if value == "quantity" else self.cell_revenue
+        cells = self._cells(start, end)
+        return np.bincount(self.cell_pizza[cells], weights=values[cells], minlength=len(self.df_pizza_dims))
+
+    def per_day_by(self, by, value, start, end):
+        """
+        days x members matrix of quantity or revenue for a pizza dimension
+        (pizza_id, pizza_type_id, name, size, category), with the members
+        """
+        members = pd.Categorical(self.df_pizza_dims[by])
+        values = self.cell_quantity if value == "quantity" else self.cell_revenue
+        days = self.days(start, end)
+        cells = self._cells(start, end)
+        n_days, n_members = days.stop - days.start, len(members.categories)
+        keys = (self.cell_day[cells] - days.start).astype("int64") * n_members + members.codes[self.cell_pizza[cells]]
+        matrix = np.bincount(keys, weights=values[cells], minlength=n_days * n_members).reshape(n_days, n_members)
+        return matrix, list(members.categories)
+
+    def best_sellers(self, by, value, start, end):
+        """quantity or revenue per pizza dimension (pizza_id, name, size, category)"""
+        totals = pd.Series(self.per_pizza(value, start, end), index=self.df_pizza_dims.index)
+        df = totals.groupby(self.df_pizza_dims[by], observed=False).sum().rename(value).to_frame().reset_index()
+        if value == "quantity":
+            df[value] = df[value].astype("int64")
+        return df
+
+    def series(self, per_day, period, start, end):
+        """
+        Roll a per day array up to "day", "month" (month of year) or
+        "quarter", dropping periods without any activity like a groupby
+        over the raw rows would.
+        """
+        days = self.days(start, end)
+        if period == "day":
+            index = pd.Index(self.dates[days], name="Date")
+            s = pd.Series(per_day, index=index)
+        elif period == "month":
+            months = np.bincount(self.day_month[days], weights=per_day, minlength=12)
+            s = pd.Series(months, index=pd.Index(MONTH_NAMES, name="Date"))
+        else:
+            quarters = np.bincount(self.day_quarter[days], weights=per_day, minlength=5)[1:]
+            s = pd.Series(quarters, index=pd.Index(np.arange(1, 5), name="Quarter"))
+        if np.issubdtype(np.asarray(per_day).dtype, np.integer):
+            s = s.round().astype("int64")
+        return s[s > 0]
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Facts
+
+Builds the denormalized order line fact table that every page reads from.
+One row per order line with the order time, the pizza dimensions, price,
+quantity and line revenue already resolved, so a page only has to filter
+and group instead of joining four tables on every rerun.
+"""
+
+# import libraries
+import numpy as np
+import pandas as pd
+
+from pizza_place import timeindex
+
+
+CALENDAR = ["day", "year", "month", "quarter", "weekday", "hour"]
+
+
+def _lookup(keys, index):
+    """row position of each key in index, raises if a key is missing"""
+    rows = pd.Index(index).get_indexer(keys)
+    if (rows < 0).any():
+        missing = pd.unique(np.asarray(keys)[rows < 0])[:5]
+        raise KeyError("unknown keys: " + ", ".join(map(str, missing)))
+    return rows
+
+
+def _take_category(values, rows):
+    """gather a column as a categorical that keeps every dimension member"""
+    values = pd.Categorical(values)
+    return pd.Categorical.from_codes(values.codes[rows], values.categories)
+
+
+def build_pizza_dimensions(df_pizza_types, df_pizzas):
+    """one row per pizza with its pizza type, name, category, size and price"""
+    type_rows = _lookup(df_pizzas["pizza_type_id"], df_pizza_types["pizza_type_id"])
+    df_pizza_dims = pd.DataFrame({
+        "pizza_id": pd.Categorical(df_pizzas["pizza_id"]),
+        "pizza_type_id": _take_category(df_pizza_types["pizza_type_id"], type_rows),
+        "name": _take_category(df_pizza_types["name"], type_rows),
+        "category": _take_category(df_pizza_types["category"], type_rows),
+        "size": pd.Categorical(df_pizzas["size"]),
+        "price": df_pizzas["price"].to_numpy(),
+    })
+    return df_pizza_dims
+
+
+def pizza_rows(pizza_ids, df_pizza_dims):
+    """row of each pizza_id in the pizza dimension table"""
+    pizza_ids = pd.Categorical(pizza_ids)
+    # a null id has code -1, which would gather the last pizza
+    if (pizza_ids.codes < 0).any():
+        raise KeyError("unknown keys: {} lines without a pizza_id".format((pizza_ids.codes < 0).sum()))
+    # resolve the few categories once and gather the codes
+    rows = _lookup(pizza_ids.categories, df_pizza_dims["pizza_id"])
+    return rows[pizza_ids.codes]
+
+
+def build_order_lines(df_order_details, df_orders, df_pizza_types, df_pizzas):
+    """
+    Join order_details -> orders, pizzas and pizza_types once.
+
+    The joins are plain positional lookups: every key is resolved to a row
+    number in the dimension table and the dimension columns are gathered
+    with numpy take, which is much cheaper than pd.merge.
+    """
+    df_pizza_dims = build_pizza_dimensions(df_pizza_types, df_pizzas)
+    order_rows = _lookup(df_order_details["order_id"], df_orders["order_id"])
+    rows = pizza_rows(df_order_details["pizza_id"], df_pizza_dims)
+
+    price = df_pizza_dims["price"].to_numpy()[rows]
+    quantity = df_order_details["quantity"].to_numpy()
+
+    df_order_lines = pd.DataFrame({
+        "order_details_id": df_order_details["order_details_id"].to_numpy(),
+        "order_id": df_order_details["order_id"].to_numpy(),
+        "datetime": pd.to_datetime(df_orders["timestamp"].to_numpy()[order_rows], unit="s"),
+        # calendar columns computed at ingest, gathered like any other dimension
+        **{column: df_orders[column].to_numpy()[order_rows] for column in CALENDAR},
+        "pizza_id": _take_category(df_pizza_dims["pizza_id"], rows),
+        "pizza_type_id": _take_category(df_pizza_dims["pizza_type_id"], rows),
+        "name": _take_category(df_pizza_dims["name"], rows),
+        "category": _take_category(df_pizza_dims["category"], rows),
+        "size": _take_category(df_pizza_dims["size"], rows),
+        "price": price,
+        "quantity": quantity,
+        "revenue": price * quantity,
+    })
+    # time sorted so a date range is a contiguous slice of rows
+    return timeindex.sort_by_time(df_order_lines)
+
+
+class OrderIndex:
+    """
+    Order ids in id order with their timestamps, so the lines of a batch
+    find their orders with binary searches instead of indexing every
+    order again.
+    """
+
+    def __init__(self, order_ids, timestamps):
+        self.order_ids = order_ids
+        self.timestamps = timestamps
+
+    @classmethod
+    def build(cls, df_orders):
+        order_ids = df_orders["order_id"].to_numpy()
+        order = np.argsort(order_ids, kind="mergesort")
+        return cls(order_ids[order], df_orders["timestamp"].to_numpy()[order])
+
+    def find(self, order_ids):
+        """position of every order id, -1 for ids not in the index"""
+        order_ids = np.asarray(order_ids)
+        if not len(self.order_ids):
+            return np.full(len(order_ids), -1)
+        at = np.minimum(np.searchsorted(self.order_ids, order_ids), len(self.order_ids) - 1)
+        return np.where(self.order_ids[at] == order_ids, at, -1)
+
+    def insert(self, df_orders):
+        """index with the orders added, this one is left untouched"""
+        new = OrderIndex.build(df_orders)
+        at = np.searchsorted(self.order_ids, new.order_ids)
+        return OrderIndex(np.insert(self.order_ids, at, new.order_ids), np.insert(self.timestamps, at, new.timestamps))
+
+    def orders(self, order_ids):
+        """order_id and timestamp of the known orders among order_ids, once each"""
+        rows = self.find(np.unique(order_ids))
+        rows = rows[rows >= 0]
+        return pd.DataFrame({"order_id": self.order_ids[rows], "timestamp": self.timestamps[rows]})
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Headless Pages
+
+Runs the page scripts themselves without a server, for the load test. A
+stand-in for the streamlit module takes the place of the real one while
+the scripts run: widgets return the values a simulated session set (or
+their defaults), st.cache_resource keeps a few entries like the real one,
+st.dataframe and st.altair_chart turn frames into Arrow and charts into
+specs like Streamlit does before sending them, and everything that only
+draws does nothing. Every thread runs the script of its own session, as
+the server does.
+"""
+
+# import libraries
+import datetime
+import importlib
+import sys
+import threading
+from collections import OrderedDict
+
+import altair as alt
+import pandas as pd
+import pyarrow as pa
+
+import pizza_place
+from pizza_place import storage
+
+
+class StopPage(Exception):
+    """st.stop()"""
+
+
+def send(*results):
+    """convert the frames of page results to arrow, as streamlit does before sending them"""
+    for result in results:
+        if isinstance(result, tuple):
+            result = result[-1]
+        if isinstance(result, pd.DataFrame):
+            pa.Table.from_pandas(result, preserve_index=False)
+
+
+def _arrow_data(data):
+    """altair data transformer doing what streamlit's does: the frame goes to arrow, the spec only names it"""
+    send(data)
+    return {"name": "data-{}".format(id(data))}
+
+
+alt.data_transformers.register("pizza_place_arrow", _arrow_data)
+
+
+class ResourceCache:
+    """
+    st.cache_resource: results by arguments, the least recently used
+    dropped past max_entries. An entry is computed once however many
+    sessions ask for it at the same time.
+    """
+
+    def __init__(self, func, max_entries=None):
+        self.func = func
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.loads = 0
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key], None
+            return None, self._loading.setdefault(key, threading.Lock())
+
+    def __call__(self, *args):
+        value, loading = self._cached(args)
+        if loading is None:
+            return value
+        with loading:
+            value, loading = self._cached(args)
+            if loading is None:
+                return value
+            value = self.func(*args)
+            with self._lock:
+                self.entries[args] = value
+                self.loads += 1
+                while self.max_entries is not None and len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                del self._loading[args]
+        return value
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+class Container:
+    """st, st.sidebar, a column, tab or expander: widgets and elements, in no particular place"""
+
+    def __init__(self, streamlit):
+        self._st = streamlit
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        # titles, text, metrics, messages, buttons: nothing to compute
+        return lambda *args, **kwargs: self
+
+    def _value(self, label, key, default):
+        return self._st.session().widgets.get(key or label, default)
+
+    def columns(self, spec, **kwargs):
+        return [Container(self._st) for _ in range(spec if isinstance(spec, int) else len(spec))]
+
+    def tabs(self, labels):
+        # every tab runs on each rerun, switching tabs happens in the browser
+        return [Container(self._st) for _ in labels]
+
+    def expander(self, *args, **kwargs):
+        return Container(self._st)
+
+    def date_input(self, label, value=None, key=None, **kwargs):
+        value = self._value(label, key, value)
+        return value.date() if isinstance(value, datetime.datetime) else value
+
+    def number_input(self, label, min_value=None, max_value=None, value=None, step=None, key=None, **kwargs):
+        return self._value(label, key, min_value if value is None else value)
+
+    def checkbox(self, label, value=False, key=None, **kwargs):
+        return self._value(label, key, value)
+
+    def radio(self, label, options, index=0, key=None, **kwargs):
+        # sessions pick options by position
+        options = list(options)
+        return options[self._value(label, key, index) % len(options)]
+
+    def selectbox(self, label, options, index=0, key=None, **kwargs):
+        options = list(options)
+        return options[self._value(label, key, index) % len(options)]
+
+    def multiselect(self, label, options, default=None, key=None, **kwargs):
+        return self._value(label, key, list(default or []))
+
+    def dataframe(self, data=None, **kwargs):
+        send(data)
+
+    def altair_chart(self, chart, **kwargs):
+        chart.to_dict()
+
+
+class Streamlit(Container):
+    """the streamlit module as the page scripts use it"""
+
+    def __init__(self):
+        super().__init__(self)
+        self.sidebar = Container(self)
+        self._local = threading.local()
+
+    def session(self):
+        """the session whose script this thread is running"""
+        return self._local.session
+
+    @property
+    def session_state(self):
+        return self.session().session_state
+
+    def cache_resource(self, func=None, **kwargs):
+        if func is None:
+            return lambda func: ResourceCache(func, kwargs.get("max_entries"))
+        return ResourceCache(func)
+
+    def experimental_get_query_params(self):
+        return {}
+
+    def stop(self):
+        raise StopPage()
+
+
+class Session:
+    """the widget values and session state of one browser session"""
+
+    def __init__(self):
+        self.widgets = {}
+        self.session_state = {}
+
+
+class Pages:
+    """
+    The page scripts run against the stand-in streamlit module, reading
+    the csv files in data_dir. While open, `import streamlit` and
+    pizza_place.shared get the stand-in and every altair chart goes
+    through the arrow transformer, so only use it in a process of its own
+    (like the loadtest command).
+    """
+
+    def __init__(self, paths, data_dir=storage.DATA_DIR):
+        self.paths = paths
+        self.data_dir = data_dir
+        self.streamlit = Streamlit()
+        self.shared = None
+        self._code = {}
+        self._saved = None
+        self._transformer = None
+
+    def __enter__(self):
+        self._saved = {name: sys.modules.get(name) for name in ["streamlit", "pizza_place.shared"]}
+        sys.modules["streamlit"] = self.streamlit
+        sys.modules.pop("pizza_place.shared", None)
+        # shared is imported again so its st is the stand-in
+        self.shared = importlib.import_module("pizza_place.shared")
+        self.shared.DATA_DIR = self.data_dir
+        # switching the transformer per chart is not thread safe, it stays on while open
+        self._transformer = alt.data_transformers.active
+        alt.data_transformers.enable("pizza_place_arrow")
+        for name, path in self.paths.items():
+            with open(path, encoding="utf-8") as f:
+                self._code[name] = compile(f.read(), path, "exec")
+        return self
+
+    def __exit__(self, *exc):
+        alt.data_transformers.enable(self._transformer)
+        for name, module in self._saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        if self._saved["pizza_place.shared"] is not None:
+            pizza_place.shared = self._saved["pizza_place.shared"]
+        return False
+
+    def run(self, page, session):
+        """run the page's script once for the session, on this thread"""
+        self.streamlit._local.session = session
+        try:
+            exec(self._code[page], {"__name__": "__main__", "__file__": self.paths[page]})
+        except StopPage:
+            pass
+        finally:
+            self.streamlit._local.session = None
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Ingest
+
+Keeps an analytics engine current while orders come in, without
+rebuilding the snapshot. New rows are picked up from two places:
+
+- rows appended to orders.csv and order_details.csv since the snapshot
+  was built (complete lines only, orders should be written before their
+  details)
+- batches dropped in pizza_sales/spool/ as <batch>.orders.csv and
+  <batch>.order_details.csv (write them under another name and rename
+  them into place so a half written file is never read)
+
+Every batch is checked before it is applied: ids must be new, orders
+need a date and time between 2000 and 2100, details must point at a
+known order and at a pizza in pizzas.csv (and through it at a pizza type
+in pizza_types.csv), quantities must be positive. Ids are checked
+against the whole snapshot, not only the months an engine loaded.
+Rows that fail are left out and reported in Live.errors.
+"""
+
+# import libraries
+import copy
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from pizza_place import analytics, storage
+
+
+SPOOL_DIR_NAME = "spool"
+
+
+def spool_dir(data_dir=storage.DATA_DIR):
+    return os.path.join(data_dir, SPOOL_DIR_NAME)
+
+
+def read_tail(path, offset):
+    """rows appended to a csv file after byte offset (complete lines only), and the offset after them"""
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    if end == 0:
+        return None, offset
+    df = pd.read_csv(io.BytesIO(header + data[:end]), dtype={"date": str, "time": str})
+    return df, offset + end
+
+
+def spool_batches(data_dir=storage.DATA_DIR, seen=()):
+    """names of the spooled batches not in seen, in name order"""
+    try:
+        names = os.listdir(spool_dir(data_dir))
+    except OSError:
+        return []
+    return sorted({name[:-len(".orders.csv")] for name in names if name.endswith(".orders.csv")} - set(seen))
+
+
+def read_spool_batch(data_dir, batch):
+    """raw order details (None if the batch has none) and orders of a spooled batch"""
+    path = os.path.join(spool_dir(data_dir), batch)
+    df_orders = pd.read_csv(path + ".orders.csv", dtype={"date": str, "time": str})
+    if not os.path.exists(path + ".order_details.csv"):
+        return None, df_orders
+    return pd.read_csv(path + ".order_details.csv"), df_orders
+
+
+def validate(df_order_details, df_orders, engine, source="batch", ids=None):
+    """
+    Type a batch of raw rows against the engine's dimensions and drop the
+    ones that break a key. Ids are checked against ids ({table: ids}, see
+    storage.load_ids), the engine's own rows when not given. Returns the
+    typed order details and orders to append and a list of error messages.
+    """
+    errors = []
+    if ids is None:
+        ids = {"orders": engine.df_orders["order_id"].to_numpy(),
+               "order_details": engine.df_order_details["order_details_id"].to_numpy()}
+    if df_orders is None:
+        df_orders = pd.DataFrame({"order_id": [], "date": [], "time": []})
+    try:
+        df_orders = storage.type_orders(df_orders)
+    except (ValueError, TypeError) as error:
+        return None, None, ["{}: unreadable orders ({})".format(source, error)]
+
+    df_orders = storage.reject_rows(df_orders, storage.order_checks(df_orders, ids["orders"]), source, errors)
+
+    if df_order_details is None or not len(df_order_details):
+        return storage.type_order_details(pd.DataFrame({"order_details_id": [], "order_id": [], "pizza_id": [], "quantity": []}),
+                                          engine.df_pizzas["pizza_id"].dtype), df_orders, errors
+
+    raw_pizza_ids = df_order_details["pizza_id"].astype(str).to_numpy()
+    df_order_details = storage.type_order_details(df_order_details, engine.df_pizzas["pizza_id"].dtype)
+    checks = storage.order_detail_checks(df_order_details,
+                                         np.concatenate([ids["orders"], df_orders["order_id"].to_numpy()]),
+                                         ids["order_details"], raw_pizza_ids)
+    df_order_details = storage.reject_rows(df_order_details, checks, source, errors)
+    return df_order_details, df_orders, errors
+
+
+class Live:
+    """
+    An engine plus where it is in the csv tails and the spool. refresh()
+    applies whatever arrived since the last call and returns the current
+    engine, it is cheap (a couple of stat calls) when nothing did.
+    """
+
+    def __init__(self, engine, data_dir=storage.DATA_DIR, offsets=None, ids=None):
+        self.engine = engine
+        self.data_dir = data_dir
+        self.offsets = dict(offsets or {})
+        # every id taken so far, the engine may only hold some months
+        if ids is None:
+            ids = {"orders": engine.df_orders["order_id"].to_numpy(),
+                   "order_details": engine.df_order_details["order_details_id"].to_numpy()}
+        self.ids = ids
+        self.seen = set()
+        self._base = (engine.version, dict(self.offsets))
+        self.errors = deque(maxlen=100)
+        self.applied = {"orders": 0, "order_details": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, data_dir=storage.DATA_DIR, results=None, start=None, end=None):
+        """engine over the snapshot (see Analytics.load) with everything that arrived since applied"""
+        engine = analytics.Analytics.load(data_dir, results, start, end)
+        live = cls(engine, data_dir, storage.appended(data_dir), storage.load_ids(data_dir))
+        # rows the snapshot build left out are reported with the ones rejected here
+        live.errors.extend(storage.rejected(data_dir))
+        live.refresh()
+        return live
+
+    def version(self):
+        """
+        Version of the data after what was read so far: the snapshot's plus
+        the csv offsets and spooled batches. An engine over any window of
+        the snapshot that read as far gets the same one, so the windows
+        share their cached results.
+        """
+        version, offsets = self._base
+        if self.offsets == offsets and not self.seen:
+            return version
+        state = json.dumps([sorted(self.offsets.items()), sorted(self.seen)])
+        return "{}+{}".format(str(version).split("+")[0], hashlib.sha256(state.encode()).hexdigest()[:12])
+
+    def _apply(self, pending):
+        """validate the (order details, orders, source) batches in turn, then append them all at once"""
+        accepted = []
+        for df_order_details, df_orders, source in pending:
+            df_order_details, df_orders, errors = validate(df_order_details, df_orders, self.engine, source, self.ids)
+            self.errors.extend(errors)
+            if df_orders is None or not (len(df_orders) or len(df_order_details)):
+                continue
+            # later batches must not reuse the ids of this one
+            self.ids = {"orders": np.concatenate([self.ids["orders"], df_orders["order_id"].to_numpy()]),
+                        "order_details": np.concatenate([self.ids["order_details"],
+                                                         df_order_details["order_details_id"].to_numpy()])}
+            accepted.append((df_order_details, df_orders))
+        if not accepted:
+            return
+        df_order_details = pd.concat([df for df, _ in accepted], ignore_index=True)
+        df_orders = pd.concat([df for _, df in accepted], ignore_index=True)
+        self.engine = self.engine.append(df_order_details, df_orders, version=self.version())
+        self.applied["orders"] += len(df_orders)
+        self.applied["order_details"] += len(df_order_details)
+
+    def _read_tails(self):
+        frames = {}
+        for table in storage.PARTITIONED:
+            path = os.path.join(self.data_dir, table + ".csv")
+            if table in self.offsets and os.path.getsize(path) > self.offsets[table]:
+                frames[table], self.offsets[table] = read_tail(path, self.offsets[table])
+        return frames
+
+    def refresh(self):
+        with self._lock:
+            pending = []
+            # a rebuilt snapshot comes with its own engine, the tails only matter until then
+            if self.offsets:
+                frames = self._read_tails()
+                if any(df is not None for df in frames.values()):
+                    pending.append((frames.get("order_details"), frames.get("orders"), "csv tail"))
+            for batch in spool_batches(self.data_dir, self.seen):
+                self.seen.add(batch)
+                try:
+                    df_order_details, df_orders = read_spool_batch(self.data_dir, batch)
+                except (OSError, ValueError) as error:
+                    self.errors.append("{}: unreadable ({})".format(batch, error))
+                    continue
+                pending.append((df_order_details, df_orders, batch))
+            # one new engine however many batches came in
+            self._apply(pending)
+            version = self.version()
+            if self.engine.version != version:
+                # only rejected rows came in, same data under the version every window agrees on
+                self.engine = copy.copy(self.engine)
+                self.engine.version = version
+            return self.engine
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Ingredients
+
+Sparse pizza_type x ingredient incidence matrix built once from
+pizza_types.csv. Ingredient totals are a single sparse matrix-vector
+product against the per pizza type totals instead of a split/explode of
+the best seller frame on every rerun.
+"""
+
+# import libraries
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class IngredientMatrix:
+    """rows are pizza types, columns are interned ingredient codes"""
+
+    def __init__(self, pizza_type_ids, ingredients, matrix):
+        self.pizza_type_ids = pd.Index(pizza_type_ids)
+        self.ingredients = pd.Index(ingredients)
+        self.matrix = matrix
+
+    @classmethod
+    def build(cls, df_pizza_types):
+        # the comma delimited lists are only split once, here
+        per_type = df_pizza_types["ingredients"].astype(str).str.split(", ")
+        n_per_type = per_type.str.len().to_numpy()
+        names = np.concatenate(per_type.to_numpy())
+        codes, ingredients = pd.factorize(names)
+        rows = np.repeat(np.arange(len(df_pizza_types)), n_per_type)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(codes), dtype="int8"), (rows, codes)),
+            shape=(len(df_pizza_types), len(ingredients)),
+        )
+        # an ingredient listed twice for a pizza still counts once
+        matrix.data[:] = 1
+        return cls(np.asarray(df_pizza_types["pizza_type_id"]), ingredients, matrix)
+
+    def totals(self, pizza_type_ids, values, name):
+        """
+        Sum values (aligned with pizza_type_ids) per ingredient, returned as
+        an ingredients / name frame.
+        """
+        values = np.asarray(values)
+        rows = self.pizza_type_ids.get_indexer(pizza_type_ids)
+        per_type = np.zeros(len(self.pizza_type_ids))
+        keep = rows >= 0
+        np.add.at(per_type, rows[keep], np.nan_to_num(values[keep].astype("float64")))
+        totals = self.matrix.T @ per_type
+        if np.issubdtype(values.dtype, np.integer):
+            totals = totals.round().astype("int64")
+        return pd.DataFrame({"ingredients": self.ingredients, name: totals})
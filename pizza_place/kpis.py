@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Period KPIs
+
+Running order count and revenue totals per day, week (starting monday)
+and month, keyed by the period itself (a date, the week's monday, a
+year-month), so December 2015 and January 2016 follow each other like
+any other two months. The latest period and the one before it are the
+last two slots of each array, so "current vs previous" is a lookup, and
+new orders are added to the totals without touching the rest.
+"""
+
+# import libraries
+import numpy as np
+
+
+PERIODS = ["day", "week", "month"]
+
+
+def period_keys(days, period):
+    """period number of days counted from 1970-01-01"""
+    days = np.asarray(days, dtype="int64")
+    if period == "day":
+        return days
+    if period == "week":
+        # 1970-01-01 was a thursday, weeks start on monday
+        return (days + 3) // 7
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype("int64")
+
+
+def period_label(key, period):
+    """the date, the week's monday or the year-month of a period number"""
+    if period == "day":
+        return str(np.datetime64(int(key), "D"))
+    if period == "week":
+        return str(np.datetime64(int(key) * 7 - 3, "D"))
+    return str(np.datetime64(int(key), "M"))
+
+
+class PeriodTotals:
+    """
+    Dense order and revenue arrays per period, from the first to the
+    latest period with orders. Adding returns new totals so readers of
+    the old ones are not disturbed.
+    """
+
+    def __init__(self, totals):
+        # {period: (first key, orders, revenue)}
+        self.totals = totals
+
+    @classmethod
+    def build(cls, days, orders, revenue):
+        """totals of per day order counts and revenue on the given day numbers"""
+        return cls({period: (0, np.zeros(0, dtype="int64"), np.zeros(0)) for period in PERIODS}).add(days, orders, revenue)
+
+    @classmethod
+    def from_cube(cls, cube):
+        """totals of everything in a rollup cube, from its per day cells"""
+        days = cube.first_day.astype("int64") + np.arange(cube.n_days)
+        revenue = np.bincount(cube.cell_day, weights=cube.cell_revenue, minlength=cube.n_days)
+        return cls.build(days, cube.order_counts.sum(axis=1), revenue)
+
+    def add(self, days, orders, revenue):
+        """totals with orders and revenue added on the given day numbers"""
+        days = np.asarray(days, dtype="int64")
+        active = (np.asarray(orders) != 0) | (np.asarray(revenue) != 0)
+        days, orders, revenue = days[active], np.asarray(orders)[active], np.asarray(revenue)[active]
+        if not len(days):
+            return self
+        totals = {}
+        for period, (first, period_orders, period_revenue) in self.totals.items():
+            keys = period_keys(days, period)
+            if len(period_orders):
+                new_first = min(first, int(keys.min()))
+                stop = max(first + len(period_orders), int(keys.max()) + 1)
+            else:
+                new_first, stop = int(keys.min()), int(keys.max()) + 1
+            grown_orders = np.zeros(stop - new_first, dtype="int64")
+            grown_revenue = np.zeros(stop - new_first)
+            grown_orders[first - new_first:first - new_first + len(period_orders)] = period_orders
+            grown_revenue[first - new_first:first - new_first + len(period_revenue)] = period_revenue
+            np.add.at(grown_orders, keys - new_first, orders)
+            np.add.at(grown_revenue, keys - new_first, revenue)
+            totals[period] = (new_first, grown_orders, grown_revenue)
+        return PeriodTotals(totals)
+
+    def current(self, period="month"):
+        """
+        orders and revenue of the latest period with orders and of the
+        period right before it (zero if there were none), with the changes
+        """
+        first, orders, revenue = self.totals[period]
+        if not len(orders):
+            return None
+        last = len(orders) - 1
+        previous_orders = int(orders[last - 1]) if last > 0 else 0
+        previous_revenue = float(revenue[last - 1]) if last > 0 else 0.0
+        return {
+            "period": period_label(first + last, period),
+            "orders": int(orders[last]),
+            "revenue": float(revenue[last]),
+            "previous_period": period_label(first + last - 1, period),
+            "previous_orders": previous_orders,
+            "previous_revenue": previous_revenue,
+            "orders_change": int(orders[last]) - previous_orders,
+            "revenue_change": float(revenue[last]) - previous_revenue,
+        }
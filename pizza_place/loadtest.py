@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Load Test
+
+How rerun latency grows with the number of sessions one process serves.
+The Streamlit server runs every session's script on its own thread, so a
+session here is a thread running the page scripts themselves against a
+stand-in for streamlit (see headless.py): the staleness check, the window
+of months from shared.analytics' cache, every result the page shows,
+its Altair charts and the frames turned into Arrow like st.dataframe and
+st.altair_chart do before they are sent, all recorded as sections like
+in the app.
+
+Sessions move between the pages and keep changing the sidebar dates (a
+standard range half of the time, any range otherwise), the seasonality
+series, the bought with pizzas, the KPI period and the raw data
+checkbox, each change being one rerun. Switching tabs happens in the
+browser without a rerun, so it costs the server nothing and is not
+simulated.
+
+    python -m pizza_place loadtest --sessions 1 2 4 8 16 --reruns 20
+"""
+
+# import libraries
+import datetime
+import os
+import platform
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from pizza_place import cache, headless, startup, storage, views
+
+
+PAGES = ["home", "orders", "sales"]
+ACTIONS = ["page", "dates", "widget"]
+
+
+def rss_bytes():
+    """current resident set size of this process, the peak where it is not available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    """largest resident set size of this process so far"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # kilobytes on linux, bytes on macos
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+class Session:
+    """the widgets of one simulated browser session"""
+
+    def __init__(self, ranges, seed):
+        self.rng = np.random.default_rng(seed)
+        self.ranges = ranges
+        self.page = "home"
+        self.state = headless.Session()
+        first, last = ranges[0]
+        self.state.widgets.update({"Start Date:": first, "End Date:": last})
+
+    def _dates(self):
+        if self.rng.random() < 0.5:
+            return self.ranges[self.rng.integers(len(self.ranges))]
+        first, last = self.ranges[0]
+        n_days = (last - first).days
+        start = first + datetime.timedelta(days=int(self.rng.integers(n_days + 1)))
+        end = min(start + datetime.timedelta(days=int(self.rng.integers(1, 120))), last)
+        return start, end
+
+    def act(self):
+        """change one widget, like a user between two reruns"""
+        action = ACTIONS[self.rng.integers(len(ACTIONS))]
+        widgets = self.state.widgets
+        if action == "page":
+            self.page = PAGES[self.rng.integers(len(PAGES))]
+        elif action == "dates":
+            widgets["Start Date:"], widgets["End Date:"] = self._dates()
+        elif self.page == "home":
+            if self.rng.random() < 0.5:
+                widgets["Show raw data"] = not widgets.get("Show raw data", False)
+            else:
+                widgets["Period:"] = int(self.rng.integers(3))
+        elif self.page == "orders":
+            for key in ["bought_with_name", "bought_with_pizza_id"]:
+                widgets[key] = int(self.rng.integers(1000))
+        else:
+            widgets["Series:"] = int(self.rng.integers(4))
+
+    def rerun(self, pages):
+        """one run of the current page's script, in seconds"""
+        start = time.perf_counter()
+        pages.run(self.page, self.state)
+        return time.perf_counter() - start
+
+
+def run_level(pages, ranges, sessions, reruns, seed=0):
+    """sessions threads doing reruns reruns each, with a cold result cache"""
+    windows = pages.shared._load
+    cache.RESULTS.invalidate()
+    stats = cache.RESULTS.stats()
+    loads = windows.loads
+    latencies = [[] for _ in range(sessions)]
+    errors = []
+    barrier = threading.Barrier(sessions + 1)
+
+    def simulate(i):
+        session = Session(ranges, seed * 1000 + i)
+        barrier.wait()
+        try:
+            for _ in range(reruns):
+                session.act()
+                latencies[i].append(session.rerun(pages))
+        except Exception as error:
+            errors.append(repr(error))
+
+    threads = [threading.Thread(target=simulate, args=(i,), daemon=True) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    if errors:
+        raise RuntimeError("{} sessions failed: {}".format(len(errors), errors[0]))
+
+    latencies = np.concatenate([np.asarray(session) for session in latencies])
+    end_stats = cache.RESULTS.stats()
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "seconds": seconds,
+        "reruns_per_second": len(latencies) / seconds,
+        "p50_seconds": float(p50),
+        "p95_seconds": float(p95),
+        "p99_seconds": float(p99),
+        "max_seconds": float(latencies.max()),
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "cache_hits": end_stats["hits"] - stats["hits"],
+        "cache_misses": end_stats["misses"] - stats["misses"],
+        "window_loads": windows.loads - loads,
+    }
+
+
+def run(levels, reruns=20, seed=0, data_dir=storage.DATA_DIR, log=None):
+    """rerun latency, throughput and memory at every concurrency level, returns the report as a dict"""
+    storage.ensure_snapshot(data_dir)
+    with headless.Pages(dict(zip(PAGES, startup.pages())), data_dir) as pages:
+        shared = pages.shared
+        full = shared._load(storage.snapshot_version(data_dir), *storage.window(data_dir=data_dir))
+        ranges = views.standard_ranges(full.engine.first_date, full.engine.last_date)
+        # the first seasonality imports statsmodels and starts the workers, keep that out of the first level
+        warm_up = Session(ranges, seed)
+        # not a standard range, those can be served by the views without decomposing anything
+        first, _ = ranges[0]
+        warm_up.state.widgets["End Date:"] = first + datetime.timedelta(days=20)
+        for page in PAGES:
+            warm_up.page = page
+            warm_up.rerun(pages)
+        levels_results = []
+        for sessions in levels:
+            result = run_level(pages, ranges, sessions, reruns, seed)
+            levels_results.append(result)
+            if log is not None:
+                log("{sessions:>4} sessions {reruns_per_second:8.1f} reruns/s  p50 {p50_seconds:.3f}s"
+                    "  p95 {p95_seconds:.3f}s  p99 {p99_seconds:.3f}s  rss {rss:,d} B  {window_loads} loads".format(
+                        rss=result["rss_bytes"] or 0, **result))
+        max_windows = shared._load.max_entries
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "reruns_per_session": reruns,
+        "max_windows": max_windows,
+        "materialized_views": len(full.engine.views or ()),
+        "results": levels_results,
+    }
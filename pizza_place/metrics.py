@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Metrics
+
+Instrumentation for named sections of a page run (load, KPIs, each tab's
+aggregation, best sellers, ingredients, seasonality, chart builds). Every
+section records its wall time, rows processed, result cache hits and
+misses and, when memory tracing is on, its peak traced memory.
+
+Records are kept in memory (the most recent ones plus running totals per
+section) and can be exported as JSON lines or in the Prometheus text
+format. Set PIZZA_PLACE_METRICS to a file path to also append every
+record to it as a JSON line, and PIZZA_PLACE_TRACE_MEMORY=1 to trace
+memory (it slows every allocation down, so it is off by default).
+"""
+
+# import libraries
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+from pizza_place import cache
+
+
+class Recorder:
+    """thread safe store of section records and per section totals"""
+
+    def __init__(self, maxlen=1000, path=None, results=None):
+        self.records = deque(maxlen=maxlen)
+        self.totals = {}
+        self.path = path
+        self.results = cache.RESULTS if results is None else results
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def section(self, name, **labels):
+        """
+        Time the body as section name. The body can set record["rows"].
+        Memory peaks are process wide, so with several sessions running at
+        once a section's peak can include their allocations too.
+        """
+        record = dict(labels, section=name, rows=None)
+        hits, misses = self.results.thread_stats()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # reset_peak is python 3.9+, before that the peak is since start
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            record["peak_bytes"] = tracemalloc.get_traced_memory()[1] - base if tracing else None
+            end_hits, end_misses = self.results.thread_stats()
+            record["cache_hits"] = end_hits - hits
+            record["cache_misses"] = end_misses - misses
+            record["time"] = time.time()
+            self.add(record)
+
+    def add(self, record):
+        with self._lock:
+            self.records.append(record)
+            total = self.totals.setdefault(record["section"], {
+                "calls": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0,
+                "cache_hits": 0, "cache_misses": 0, "peak_bytes": 0,
+            })
+            total["calls"] += 1
+            total["seconds"] += record["seconds"]
+            total["max_seconds"] = max(total["max_seconds"], record["seconds"])
+            total["rows"] += record["rows"] or 0
+            total["cache_hits"] += record["cache_hits"]
+            total["cache_misses"] += record["cache_misses"]
+            total["peak_bytes"] = max(total["peak_bytes"], record["peak_bytes"] or 0)
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+
+    def recent(self, **labels):
+        """the kept records matching every label"""
+        with self._lock:
+            return [r for r in self.records if all(r.get(k) == v for k, v in labels.items())]
+
+    def to_jsonl(self, records=None):
+        records = self.recent() if records is None else records
+        return "".join(json.dumps(record) + "\n" for record in records)
+
+    def to_prometheus(self):
+        """running totals per section and the result cache counters, Prometheus text format"""
+        with self._lock:
+            totals = {name: dict(total) for name, total in self.totals.items()}
+        lines = []
+        for metric, kind, help_text in [
+            ("calls", "counter", "section runs"),
+            ("seconds", "counter", "wall time spent in the section"),
+            ("max_seconds", "gauge", "slowest run of the section"),
+            ("rows", "counter", "rows processed by the section"),
+            ("cache_hits", "counter", "result cache hits in the section"),
+            ("cache_misses", "counter", "result cache misses in the section"),
+            ("peak_bytes", "gauge", "largest traced memory peak of the section"),
+        ]:
+            name = "pizza_place_section_" + metric + ("_total" if kind == "counter" else "")
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} {}".format(name, kind))
+            for section, total in sorted(totals.items()):
+                lines.append('{}{{section="{}"}} {}'.format(name, section, total[metric]))
+        for metric, value in self.results.stats().items():
+            kind = "gauge" if metric in ("size", "maxsize") else "counter"
+            name = "pizza_place_cache_" + metric + ("_total" if kind == "counter" else "")
+            lines.append("# TYPE {} {}".format(name, kind))
+            lines.append("{} {}".format(name, value))
+        return "\n".join(lines) + "\n"
+
+
+class Instrumented:
+    """
+    Proxy of an analytics engine that records every cached result method
+    as a section named after the method and its arguments (e.g.
+    best_sellers.name.quantity), with the order lines in the range as rows
+    (every line for results of the latest data, like period_kpis).
+    """
+
+    def __init__(self, engine, recorder=None, **labels):
+        self._engine = engine
+        self._recorder = RECORDER if recorder is None else recorder
+        self._labels = labels
+
+    def __getattr__(self, name):
+        attr = getattr(self._engine, name)
+        if not getattr(attr, "cached", False):
+            return attr
+
+        def timed(start, end, args, call):
+            section = ".".join([name] + [str(arg) for arg in args if arg is not None])
+            with self._recorder.section(section, **self._labels) as record:
+                record["rows"] = self._engine.n_lines(start, end)
+                return call()
+
+        if not getattr(attr, "ranged", True):
+            return lambda *args: timed(self._engine.first_date, self._engine.last_date, args, lambda: attr(*args))
+        return lambda start, end, *args: timed(start, end, args, lambda: attr(start, end, *args))
+
+
+if os.environ.get("PIZZA_PLACE_TRACE_MEMORY") and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+# one recorder per process
+RECORDER = Recorder(path=os.environ.get("PIZZA_PLACE_METRICS"))
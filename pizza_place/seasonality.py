@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Seasonality
+
+Seasonal decomposition of many daily series at once (total sales, or one
+series per category, size or pizza type). Large batches fan out over a
+process pool so the work scales with the number of cores, and results
+come back as plain numpy arrays that are cheap to cache and chart.
+"""
+
+# import libraries
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+PERIOD = 7
+COMPONENTS = ["observed", "trend", "seasonal", "resid"]
+
+# below this many series the pool costs more than it saves
+MIN_PARALLEL = 4
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, forking the threaded app server is not safe
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def decompose(values, period=PERIOD):
+    """
+    Decompose one daily series into its components. Multiplicative like
+    the app always used, unless the series has zero or negative days where
+    only an additive model is defined.
+    """
+    # statsmodels takes about a second to import, load it on first use
+    from statsmodels.tsa import seasonal as smts
+
+    values = np.asarray(values, dtype="float64")
+    model = "multiplicative" if (values > 0).all() else "additive"
+    result = smts.seasonal_decompose(values, model=model, period=period)
+    return {
+        "model": model,
+        "observed": values,
+        "trend": np.asarray(result.trend),
+        "seasonal": np.asarray(result.seasonal),
+        "resid": np.asarray(result.resid),
+    }
+
+
+def _decompose_batch(batch, period):
+    return [(name, decompose(values, period)) for name, values in batch]
+
+
+def decompose_many(series, period=PERIOD, workers=None):
+    """
+    Decompose every series of a {name: values} dict, in worker processes
+    when there are enough of them. Series without any activity are
+    skipped, and so are series shorter than two periods, which cannot be
+    decomposed (a long range can have only a few days with sales).
+    """
+    items = [(name, values) for name, values in series.items()
+             if len(values) >= 2 * period and np.any(np.asarray(values) != 0)]
+    workers = os.cpu_count() if workers is None else workers
+    if workers <= 1 or len(items) < MIN_PARALLEL:
+        return dict(_decompose_batch(items, period))
+
+    # one batch per worker keeps the pickling overhead down
+    batches = [items[i::workers] for i in range(workers) if items[i::workers]]
+    futures = [_get_pool().submit(_decompose_batch, batch, period) for batch in batches]
+    results = dict(pair for future in futures for pair in future.result())
+    return {name: results[name] for name, _ in items}
+
+
+def to_frame(dates, results):
+    """long frame with one row per date and series, ready for charting"""
+    frames = []
+    for name, result in results.items():
+        df = pd.DataFrame({component: result[component] for component in COMPONENTS})
+        df.insert(0, "Series", name)
+        df.insert(0, "Date", np.asarray(dates))
+        df["model"] = result["model"]
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=["Date", "Series"] + COMPONENTS + ["model"])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Shared Data
+
+The one analytics engine every Streamlit session and page reads from.
+It lives in st.cache_resource, so it is built once per process and handed
+out by reference: no per session copies, and a page opened directly works
+without the home page having run first.
+
+The frames on the engine are shared by every user and must not be
+modified in place.
+"""
+
+# import libraries
+import math
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from pizza_place import browser, cache, ingest, metrics, storage, timeindex
+
+
+# the csv files the app reads, the load test points it at its own
+DATA_DIR = storage.DATA_DIR
+
+def page_config(page):
+    """title and icon of every page, has to be the first streamlit call on the page"""
+    st.set_page_config(
+        page_title = "Pizza Place Analysis",
+        page_icon = ":pizza:"
+        )
+    # labels for the metrics of this run
+    st.session_state.setdefault("_session", uuid.uuid4().hex[:8])
+    st.session_state["_run"] = st.session_state.get("_run", 0) + 1
+    st.session_state["_page"] = page
+
+
+def _labels():
+    return {"page": st.session_state.get("_page"), "session": st.session_state.get("_session"),
+            "run": st.session_state.get("_run")}
+
+
+def section(name):
+    """record the body as a section of this page run"""
+    return metrics.RECORDER.section(name, **_labels())
+
+
+def chart(name, c):
+    """write an altair chart, recording the build as chart.<name>"""
+    with section("chart." + name) as record:
+        record["rows"] = len(c.data)
+        st.altair_chart(c, use_container_width=True)
+
+
+# a few windows of the current version, e.g. the home page's full history
+# and the months picked on the other pages
+@st.cache_resource(show_spinner="Loading data...", max_entries=4)
+def _load(version, first_month, last_month):
+    return ingest.Live.load(DATA_DIR, start=first_month, end=last_month)
+
+
+def analytics(start=None, end=None):
+    """
+    the engine for the current snapshot, rebuilding the snapshot if the csv
+    files changed and applying rows appended or spooled since, with every
+    result it computes recorded as a section. Given a date range only the
+    months overlapping it are loaded.
+    """
+    with section("load"):
+        storage.ensure_snapshot(DATA_DIR)
+        first_month, last_month = storage.window(start, end, DATA_DIR)
+        engine = _load(storage.snapshot_version(DATA_DIR), first_month, last_month).refresh()
+    return metrics.Instrumented(engine, **_labels())
+
+
+def admin_panel():
+    """hidden performance panel of this run, shown with ?admin=1 or PIZZA_PLACE_ADMIN=1"""
+    if not (os.environ.get("PIZZA_PLACE_ADMIN") or st.experimental_get_query_params().get("admin") == ["1"]):
+        return
+    records = metrics.RECORDER.recent(**_labels())
+    with st.sidebar.expander(":stopwatch: Performance", expanded=True):
+        df = pd.DataFrame(records, columns=["section", "seconds", "rows", "cache_hits", "cache_misses", "peak_bytes"])
+        st.dataframe(df.sort_values("seconds", ascending=False), use_container_width=True)
+        results = cache.RESULTS.stats()
+        st.caption("{:.3f}s in {} sections, result cache {hits:,d} hits ({view_hits:,d} from views) / {misses:,d} misses, {size} of {maxsize} entries".format(
+            df["seconds"].sum(), len(df), **results))
+        st.download_button("JSON lines", metrics.RECORDER.to_jsonl(), "metrics.jsonl")
+        st.download_button("Prometheus", metrics.RECORDER.to_prometheus(), "metrics.prom")
+
+
+def order_filters(engine, key, pizzas=False):
+    """order id and date range (and pizza and size) filters for a raw table"""
+    col_first, col_last, col_dates = st.columns(3)
+    order_ids = engine.raw_tables["orders"].df["order_id"]
+    first_id = col_first.number_input("From order", value=int(order_ids.min()), step=1, key=key + "_first")
+    last_id = col_last.number_input("To order", value=int(order_ids.max()), step=1, key=key + "_last")
+    dates = col_dates.date_input("Dates", (engine.first_date, engine.last_date), key=key + "_dates")
+    filters = {"order_id": (first_id, last_id)}
+    # the widget holds one date while the second is being picked
+    if len(dates) == 2:
+        first, stop = timeindex.day_bounds(*dates)
+        filters["datetime"] = (first, stop - np.timedelta64(1, "s"))
+    if pizzas:
+        col_pizza, col_size = st.columns(2)
+        df = engine.raw_tables["pizzas"].df
+        pizza_ids = col_pizza.multiselect("Pizza", sorted(df["pizza_id"].astype(str)), key=key + "_pizza")
+        sizes = col_size.multiselect("Size", sorted(df["size"].astype(str).unique()), key=key + "_size")
+        if pizza_ids:
+            filters["pizza_id"] = pizza_ids
+        if sizes:
+            filters["size"] = sizes
+    return filters
+
+
+def browse(table, key, filters=None):
+    """one page of a raw table, only that page is sent to the browser"""
+    col_sort, col_order, col_size, col_page = st.columns(4)
+    sort_by = col_sort.selectbox("Sort by", ["(table order)"] + list(table.df.columns), key=key + "_sort")
+    descending = col_order.selectbox("Order", ["Ascending", "Descending"], key=key + "_order") == "Descending"
+    page_size = col_size.selectbox("Rows per page", browser.PAGE_SIZES, index=1, key=key + "_page_size")
+    page = col_page.number_input("Page", min_value=1, value=1, step=1, key=key + "_page")
+
+    sort_by = None if sort_by == "(table order)" else sort_by
+    df_page, n_rows = table.page(filters, sort_by, not descending, page - 1, page_size)
+    n_pages = max(math.ceil(n_rows / page_size), 1)
+    if page > n_pages:
+        page = n_pages
+        df_page, n_rows = table.page(filters, sort_by, not descending, page - 1, page_size)
+    st.dataframe(df_page, use_container_width=True)
+    first = (page - 1) * page_size
+    st.caption("Rows {:,d} to {:,d} of {:,d} (page {:,d} of {:,d})".format(
+        min(first + 1, n_rows), first + len(df_page), n_rows, page, n_pages))
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Sketches
+
+Distributions of order value and pizzas per order, kept per day as
+mergeable quantile sketches built once at ingest. A date range merges the
+daily sketches of its days, so percentiles and histograms never go back
+to the order lines.
+
+The sketches are DDSketches: a value falls in bucket ceil(log(value) /
+log(gamma)), so every bucket is gamma times wider than the one before
+and any quantile is within RELATIVE_ACCURACY of the true one. Merging is
+adding bucket counts, which is exact, and a day only has as many cells as
+distinct buckets, a few dozen, however many orders it had. The exact
+count, sum, min and max per day are kept next to them for the KPIs.
+"""
+
+# import libraries
+import numpy as np
+import pandas as pd
+
+from pizza_place import timeindex
+
+
+RELATIVE_ACCURACY = 0.01
+QUANTILES = [0.5, 0.9, 0.99]
+# bucket of values <= 0, which have no log
+ZERO_BUCKET = np.iinfo("int16").min
+
+
+def _day_numbers(start, end):
+    """half open [first, stop) day numbers of the inclusive date range"""
+    first, stop = timeindex.day_bounds(start, end)
+    return int(first.astype("datetime64[D]").astype("int64")), int(stop.astype("datetime64[D]").astype("int64"))
+
+
+def _runs(keys):
+    """start of every run of equal rows in sorted keys, and one past the last row"""
+    if not len(keys[0]):
+        return np.zeros(1, dtype="int64")
+    changed = np.zeros(len(keys[0]), dtype=bool)
+    changed[0] = True
+    for key in keys:
+        changed[1:] |= key[1:] != key[:-1]
+    return np.append(np.flatnonzero(changed), len(keys[0]))
+
+
+class DaySketches:
+    """
+    One sketch per day with orders. Days and cells are sorted by day, so
+    a date range is a slice of each found with binary searches.
+    """
+
+    def __init__(self, days, count, total, low, high, cell_day, cell_bucket, cell_count, alpha=RELATIVE_ACCURACY,
+                 integer=False):
+        # exact per day summaries
+        self.days = days
+        self.count = count
+        self.total = total
+        self.low = low
+        self.high = high
+        # (day, bucket) cells with the orders in them
+        self.cell_day = cell_day
+        self.cell_bucket = cell_bucket
+        self.cell_count = cell_count
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        # whole numbers, estimates are rounded and histogram bins hold whole numbers
+        self.integer = integer
+
+    def __len__(self):
+        return len(self.cell_count)
+
+    @classmethod
+    def build(cls, days, values, alpha=RELATIVE_ACCURACY, integer=False):
+        """sketches of values (one per order) on the given day numbers"""
+        days = np.asarray(days, dtype="int64")
+        values = np.asarray(values, dtype="float64")
+        gamma = (1 + alpha) / (1 - alpha)
+        buckets = np.full(len(values), ZERO_BUCKET, dtype="int64")
+        positive = values > 0
+        buckets[positive] = np.ceil(np.log(values[positive]) / np.log(gamma))
+
+        order = np.lexsort((buckets, days))
+        days, values, buckets = days[order], values[order], buckets[order]
+        day_runs = _runs([days])[:-1]
+        cell_runs = _runs([days, buckets])
+        return cls(
+            days[day_runs].astype("int32"),
+            np.diff(np.append(day_runs, len(days))).astype("int32"),
+            np.add.reduceat(values, day_runs) if len(days) else np.zeros(0),
+            np.minimum.reduceat(values, day_runs) if len(days) else np.zeros(0),
+            np.maximum.reduceat(values, day_runs) if len(days) else np.zeros(0),
+            days[cell_runs[:-1]].astype("int32"),
+            buckets[cell_runs[:-1]].astype("int16"),
+            np.diff(cell_runs).astype("int32"),
+            alpha,
+            integer,
+        )
+
+    def replace(self, other):
+        """
+        sketches with the days of other taken from other, for days whose
+        orders were rebuilt after new lines came in. Both are sorted by
+        day, so other's days are found with binary searches and spliced
+        in, the history is not searched or sorted again.
+        """
+        def spliced(keep, keys, other_keys, columns):
+            # other's days are not among the kept ones, so its rows go in before the next kept day
+            at = np.searchsorted(keys[keep], other_keys)
+            return [np.insert(mine[keep], at, theirs) for mine, theirs in columns]
+
+        lo = np.minimum(np.searchsorted(self.days, other.days), len(self.days) - 1)
+        keep_days = np.ones(len(self.days), dtype=bool)
+        if len(self.days):
+            keep_days[lo[self.days[lo] == other.days]] = False
+        # cells of other's days, a run per day
+        edges = np.zeros(len(self.cell_day) + 1, dtype="int64")
+        np.add.at(edges, np.searchsorted(self.cell_day, other.days, side="left"), 1)
+        np.add.at(edges, np.searchsorted(self.cell_day, other.days, side="right"), -1)
+        keep_cells = np.cumsum(edges)[:-1] == 0
+        days, count, total, low, high = spliced(keep_days, self.days, other.days, [
+            (self.days, other.days), (self.count, other.count), (self.total, other.total), (self.low, other.low),
+            (self.high, other.high)])
+        cell_day, cell_bucket, cell_count = spliced(keep_cells, self.cell_day, other.cell_day, [
+            (self.cell_day, other.cell_day), (self.cell_bucket, other.cell_bucket), (self.cell_count, other.cell_count)])
+        return DaySketches(days, count, total, low, high, cell_day, cell_bucket, cell_count, self.alpha, self.integer)
+
+    def summary(self, start, end):
+        """exact number of orders and mean, max and min value over the range (nan without orders)"""
+        first, stop = _day_numbers(start, end)
+        lo, hi = np.searchsorted(self.days, [first, stop])
+        count = int(self.count[lo:hi].sum())
+        if not count:
+            return {"count": 0, "mean": np.nan, "max": np.nan, "min": np.nan}
+        return {"count": count, "mean": float(self.total[lo:hi].sum() / count),
+                "max": float(self.high[lo:hi].max()), "min": float(self.low[lo:hi].min())}
+
+    def merged(self, start, end):
+        """buckets (ascending) and their orders over the range, the merged sketch"""
+        first, stop = _day_numbers(start, end)
+        lo, hi = np.searchsorted(self.cell_day, [first, stop])
+        buckets, inverse = np.unique(self.cell_bucket[lo:hi], return_inverse=True)
+        return buckets, np.bincount(inverse, weights=self.cell_count[lo:hi], minlength=len(buckets)).astype("int64")
+
+    def _values(self, buckets):
+        """the value every bucket stands for, within alpha of anything in it"""
+        values = 2 * self.gamma ** buckets.astype("float64") / (self.gamma + 1)
+        values = np.where(buckets == ZERO_BUCKET, 0.0, values)
+        # the relative error is below half of one for small whole numbers
+        return np.round(values) if self.integer else values
+
+    def quantiles(self, start, end, quantiles=QUANTILES):
+        """estimates of the quantiles over the range, kept within the exact min and max"""
+        buckets, counts = self.merged(start, end)
+        if not len(buckets):
+            return np.full(len(quantiles), np.nan)
+        ranks = np.asarray(quantiles) * (counts.sum() - 1)
+        at = np.searchsorted(np.cumsum(counts), ranks, side="right")
+        summary = self.summary(start, end)
+        return np.clip(self._values(buckets[at]), summary["min"], summary["max"])
+
+    def histogram(self, start, end, bins=20):
+        """
+        orders in bins equal width bins between the min and max over the
+        range, whole numbers never split between two bins
+        """
+        buckets, counts = self.merged(start, end)
+        summary = self.summary(start, end)
+        if not len(buckets):
+            return pd.DataFrame({"From": [], "To": [], "Orders": []})
+        low, high = summary["min"], summary["max"]
+        values = np.clip(self._values(buckets), low, high)
+        if self.integer:
+            width = max(np.ceil((high - low + 1) / bins), 1)
+            edges = np.arange(low - 0.5, high + width, width)
+            orders, edges = np.histogram(values, bins=edges, weights=counts)
+            return pd.DataFrame({"From": (edges[:-1] + 0.5).astype("int64"), "To": (edges[1:] - 0.5).astype("int64"),
+                                 "Orders": orders.astype("int64")})
+        orders, edges = np.histogram(values, bins=bins, range=(low, high), weights=counts)
+        return pd.DataFrame({"From": edges[:-1], "To": edges[1:], "Orders": orders.astype("int64")})
+
+
+def build_order_sketches(df_order_lines, alpha=RELATIVE_ACCURACY):
+    """
+    daily sketches of order value (revenue) and pizzas per order (quantity)
+    of the orders in the order lines
+    """
+    codes, _ = pd.factorize(df_order_lines["order_id"])
+    n_orders = int(codes.max()) + 1 if len(codes) else 0
+    # every line of an order is on the order's day
+    days = np.zeros(n_orders, dtype="int64")
+    days[codes] = df_order_lines["day"].to_numpy()
+    return {
+        value: DaySketches.build(days, np.bincount(codes, weights=df_order_lines[value].to_numpy(), minlength=n_orders),
+                                 alpha, integer=value == "quantity")
+        for value in ["revenue", "quantity"]
+    }
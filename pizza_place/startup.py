@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Startup Profile
+
+Cold start cost of every page: each page script is run once in a fresh
+interpreter under -X importtime (Streamlit calls are no-ops outside a
+server), and the time to first paint is split into the interpreter
+start, the imports (broken down by top level package) and the script
+itself, which includes loading the data.
+
+    python -m pizza_place startup
+"""
+
+# import libraries
+import glob
+import os
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_RUNNER = """
+import runpy, sys, time
+sys.stderr.write("page_start\\n")
+start = time.perf_counter()
+runpy.run_path(sys.argv[1], run_name="__main__")
+sys.stdout.write("script_seconds=%f\\n" % (time.perf_counter() - start))
+"""
+
+
+def pages(root=ROOT):
+    """the home script and every page, in the order of the sidebar"""
+    home = sorted(glob.glob(os.path.join(root, "1_*.py")))
+    return home + sorted(glob.glob(os.path.join(root, "pages", "*.py")))
+
+
+def parse_importtime(lines):
+    """
+    seconds per top level package from -X importtime output, counting
+    only the imports of the page itself
+    """
+    packages = {}
+    lines = list(lines)
+    if "page_start" in lines:
+        lines = lines[lines.index("page_start") + 1:]
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # nesting is shown by indentation, top level imports have one space
+        if name.startswith("  "):
+            continue
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(cumulative) / 1e6
+    return packages
+
+
+def profile_page(path, root=ROOT):
+    """cold start breakdown of one page script, in seconds"""
+    env = dict(os.environ, PYTHONPATH=root + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _RUNNER, path], cwd=root, env=env,
+                          capture_output=True, text=True)
+    total = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError("{} failed:\n{}".format(path, proc.stderr[-2000:]))
+
+    script = float(proc.stdout.rsplit("script_seconds=", 1)[1])
+    packages = parse_importtime(proc.stderr.splitlines())
+    imports = sum(packages.values())
+    return {
+        "page": os.path.relpath(path, root),
+        "first_paint_seconds": total,
+        "interpreter_seconds": total - script,
+        "import_seconds": imports,
+        "script_seconds": script - imports,
+        "imports": dict(sorted(packages.items(), key=lambda item: -item[1])),
+    }
+
+
+def run(paths=None, root=ROOT):
+    """startup profile of the given pages (default: all of them)"""
+    return [profile_page(path, root) for path in (paths or pages(root))]
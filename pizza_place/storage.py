@@ -0,0 +1,555 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Storage
+
+Turns the csv files in pizza_sales/ into a typed columnar snapshot
+(Arrow IPC files) that can be memory mapped on cold start. The snapshot is
+only rebuilt when the checksums of the source csv files change.
+
+Orders and order details are partitioned by the month of the order
+(orders/2015-01.arrow, order_details/2015-01.arrow, ...), so loading a
+date range only reads the months that overlap it.
+
+Rows that break a key (an order detail of an unknown order or pizza, a
+reused id) are left out of the snapshot and listed in its manifest.
+"""
+
+# import libraries
+import hashlib
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.ipc
+
+from pizza_place import timeindex
+
+
+# where the data lives
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pizza_sales")
+SNAPSHOT_DIR_NAME = ".snapshot"
+MANIFEST_NAME = "manifest.json"
+
+# bump this whenever the snapshot layout changes
+SNAPSHOT_VERSION = 6
+
+TABLES = ["order_details", "orders", "pizza_types", "pizzas"]
+# split by month, the rest are small enough to always load whole
+PARTITIONED = ["order_details", "orders"]
+# key of the partitioned tables, every one of them is also kept unpartitioned
+# so new rows can be checked against the whole history whatever was loaded
+ID_COLUMNS = {"order_details": "order_details_id", "orders": "order_id"}
+
+# columns and types of the csv files, anything else in them is ignored
+CSV_SCHEMAS = {
+    "order_details": {"order_details_id": pa.int32(), "order_id": pa.int32(),
+                      "pizza_id": pa.dictionary(pa.int32(), pa.string()), "quantity": pa.int16()},
+    "orders": {"order_id": pa.int32(), "date": pa.date32(), "time": pa.time32("s")},
+    "pizza_types": {"pizza_type_id": pa.string(), "name": pa.string(), "category": pa.string(), "ingredients": pa.string()},
+    "pizzas": {"pizza_id": pa.string(), "pizza_type_id": pa.string(), "size": pa.string(), "price": pa.float64()},
+}
+# the menu files are not utf-8
+CSV_ENCODINGS = {"pizza_types": "latin1", "pizzas": "latin1"}
+# arrow parses a file in blocks of this many bytes, on as many threads as there are blocks
+CSV_BLOCK_SIZE = 16 << 20
+
+# timestamp of an order without a date or time that parses
+NO_TIMESTAMP = np.iinfo("int64").min
+# orders outside these years [first, last) are unparsed or mistyped dates, not sales
+ORDER_YEARS = (2000, 2100)
+
+# one rebuild at a time in this process
+_BUILD_LOCK = threading.Lock()
+
+
+def _checksum(path):
+    """sha256 of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_checksums(data_dir=DATA_DIR):
+    """checksums of the four source csv files"""
+    return {table: _checksum(os.path.join(data_dir, table + ".csv")) for table in TABLES}
+
+
+def source_stats(data_dir=DATA_DIR):
+    """size and modification time of the four source csv files"""
+    stats = {}
+    for table in TABLES:
+        stat = os.stat(os.path.join(data_dir, table + ".csv"))
+        stats[table] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def snapshot_dir(data_dir=DATA_DIR):
+    return os.path.join(data_dir, SNAPSHOT_DIR_NAME)
+
+
+def _read_manifest(data_dir):
+    try:
+        with open(os.path.join(snapshot_dir(data_dir), MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(data_dir, manifest):
+    """replace the manifest in one step"""
+    path = os.path.join(snapshot_dir(data_dir), MANIFEST_NAME)
+    tmp_path = "{}.{}.tmp".format(path, uuid.uuid4().hex[:8])
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _tail_checksum(path, size, block=4096):
+    """sha256 of the last block bytes before size, to tell an append from an edit"""
+    with open(path, "rb") as f:
+        f.seek(max(size - block, 0))
+        return hashlib.sha256(f.read(min(size, block))).hexdigest()
+
+
+def source_tails(data_dir=DATA_DIR, stats=None):
+    """tail checksums of the partitioned csv files at the sizes in stats"""
+    stats = source_stats(data_dir) if stats is None else stats
+    return {table: _tail_checksum(os.path.join(data_dir, table + ".csv"), stats[table][0]) for table in PARTITIONED}
+
+
+def appended(data_dir=DATA_DIR, manifest=None):
+    """
+    Byte offsets where new rows start if orders.csv and order_details.csv
+    only had rows appended since the snapshot was built (and nothing else
+    changed), otherwise None.
+    """
+    manifest = _read_manifest(data_dir) if manifest is None else manifest
+    if not manifest or "tails" not in manifest:
+        return None
+    stats = source_stats(data_dir)
+    if any(stats[table] != manifest["stats"][table] for table in TABLES if table not in PARTITIONED):
+        return None
+    offsets = {table: manifest["stats"][table][0] for table in PARTITIONED}
+    if any(stats[table][0] < offsets[table] for table in PARTITIONED):
+        return None
+    if source_tails(data_dir, manifest["stats"]) != manifest["tails"]:
+        return None
+    return offsets
+
+
+def _snapshot_files(data_dir, manifest):
+    out_dir = snapshot_dir(data_dir)
+    files = [os.path.join(out_dir, table + ".arrow") for table in TABLES if table not in PARTITIONED]
+    files += [_ids_path(out_dir, table) for table in PARTITIONED]
+    for key in manifest.get("partitions", []):
+        files += [os.path.join(out_dir, table, key + ".arrow") for table in PARTITIONED]
+    return files
+
+
+def is_stale(data_dir=DATA_DIR):
+    """
+    True when the snapshot is missing or was built from different csv
+    files. Rows only appended to orders.csv and order_details.csv do not
+    make it stale.
+    """
+    manifest = _read_manifest(data_dir)
+    if manifest is None or manifest.get("version") != SNAPSHOT_VERSION:
+        return True
+    if any(not os.path.exists(path) for path in _snapshot_files(data_dir, manifest)):
+        return True
+    # cheap check first, this runs on every rerun
+    if manifest.get("stats") == source_stats(data_dir):
+        return False
+    # appended rows are read from the csv tails (see ingest), no rebuild needed
+    if appended(data_dir, manifest) is not None:
+        return False
+    # stat before hashing, a file changed in between is hashed again next time
+    stats = source_stats(data_dir)
+    if manifest.get("checksums") != source_checksums(data_dir):
+        return True
+    # touched or copied but not changed, stamp the new times so the next
+    # rerun takes the cheap check and appends are still told apart
+    _write_manifest(data_dir, dict(manifest, stats=stats))
+    return False
+
+
+def _read_csv_arrow(data_dir, table):
+    """one csv file as an arrow table of its schema, parsed block by block on arrow's threads"""
+    read_options = pa.csv.ReadOptions(block_size=CSV_BLOCK_SIZE, encoding=CSV_ENCODINGS.get(table, "utf8"))
+    convert_options = pa.csv.ConvertOptions(column_types=CSV_SCHEMAS[table], include_columns=list(CSV_SCHEMAS[table]))
+    arrow_table = pa.csv.read_csv(os.path.join(data_dir, table + ".csv"), read_options=read_options,
+                                  convert_options=convert_options)
+    if any(column.null_count for column in arrow_table.columns):
+        raise pa.ArrowInvalid("{}.csv has empty values".format(table))
+    return arrow_table
+
+
+def _arrow_orders(arrow_table):
+    """order ids and epoch seconds of the parsed date32 and time32 columns"""
+    days = arrow_table["date"].cast(pa.int32()).to_numpy().astype("int64")
+    seconds = arrow_table["time"].cast(pa.int32()).to_numpy()
+    return pd.DataFrame({"order_id": arrow_table["order_id"].to_numpy(), "timestamp": days * 86400 + seconds})
+
+
+def _read_csv_pandas(data_dir):
+    df_pizza_types = pd.read_csv(os.path.join(data_dir, "pizza_types.csv"), encoding="latin-1")
+    df_pizzas = pd.read_csv(os.path.join(data_dir, "pizzas.csv"), encoding="latin-1")
+    df_orders = pd.read_csv(os.path.join(data_dir, "orders.csv"), dtype={"date": str, "time": str})
+    df_order_details = pd.read_csv(os.path.join(data_dir, "order_details.csv"))
+    return df_order_details, df_orders, df_pizza_types, df_pizzas
+
+
+def read_csv_tables(data_dir=DATA_DIR):
+    """
+    Read and type the four source csv files. They are read at the same
+    time, each with arrow's multithreaded reader against a fixed schema, so
+    dates and times are parsed in C and ids come out as compact integers
+    and dictionaries. Files arrow cannot read as declared (odd time
+    strings, empty values) go through pandas, which is slower but more
+    forgiving. Every file is parsed whole before it is converted, so
+    memory grows with the files like it does with pandas.
+    """
+    with ThreadPoolExecutor(max_workers=len(TABLES)) as pool:
+        futures = {table: pool.submit(_read_csv_arrow, data_dir, table) for table in TABLES}
+        try:
+            tables = {table: future.result() for table, future in futures.items()}
+        except pa.ArrowException:
+            tables = None
+    if tables is None:
+        return type_tables(*_read_csv_pandas(data_dir))
+    return type_tables(tables["order_details"].to_pandas(), _arrow_orders(tables["orders"]),
+                       tables["pizza_types"].to_pandas(), tables["pizzas"].to_pandas())
+
+
+def _parse_times(times):
+    """seconds since midnight of fixed width HH:MM:SS strings, None if any value is not"""
+    raw = np.asarray(times, dtype="S8")
+    chars = raw.view(np.uint8).reshape(len(raw), 8)
+    if len(raw) and not ((chars[:, [2, 5]] == ord(":")).all() and (chars[:, [0, 1, 3, 4, 6, 7]] - ord("0") < 10).all()):
+        return None
+    digits = chars.astype("int64") - ord("0")
+    return (digits[:, 0] * 10 + digits[:, 1]) * 3600 + (digits[:, 3] * 10 + digits[:, 4]) * 60 + digits[:, 6] * 10 + digits[:, 7]
+
+
+def parse_timestamps(dates, times):
+    """
+    Epoch seconds (int64) of the YYYY-MM-DD date and HH:MM:SS time string
+    columns. Dates go through numpy's ISO parser and times are decoded
+    straight from their bytes, no per row string concatenation or format
+    inference. Rows with an empty or unreadable date or time get
+    NO_TIMESTAMP.
+    """
+    seconds = _parse_times(times)
+    days = None
+    if seconds is not None:
+        try:
+            days = np.asarray(dates, dtype="datetime64[D]")
+        except (ValueError, TypeError):
+            pass
+    if days is None:
+        # odd strings or empty values, take the slow but forgiving path
+        stamps = pd.to_datetime(pd.Series(dates).astype(str) + " " + pd.Series(times).astype(str),
+                                format="%Y-%m-%d %H:%M:%S", errors="coerce")
+        return np.where(stamps.isna(), NO_TIMESTAMP, stamps.values.astype("datetime64[s]").astype("int64"))
+    # an empty date is NaT, which would wrap around to 1970-01-01
+    return np.where(np.isnat(days), NO_TIMESTAMP, days.astype("int64") * 86400 + seconds)
+
+
+def calendar_columns(timestamps):
+    """
+    Compact calendar columns of epoch seconds, computed once at ingest so
+    the pages never need datetime accessors.
+    """
+    timestamps = np.asarray(timestamps, dtype="int64")
+    day = timestamps // 86400
+    months = day.astype("datetime64[D]").astype("datetime64[M]").astype("int64")
+    return {
+        "day": day.astype("int32"),
+        "year": (months // 12 + 1970).astype("int16"),
+        "month": (months % 12 + 1).astype("int8"),
+        "quarter": (months % 12 // 3 + 1).astype("int8"),
+        # 1970-01-01 was a thursday, monday = 0
+        "weekday": ((day + 3) % 7).astype("int8"),
+        "hour": (timestamps % 86400 // 3600).astype("int8"),
+    }
+
+
+def type_tables(df_order_details, df_orders, df_pizza_types, df_pizzas):
+    """apply the snapshot schema to the raw csv frames"""
+    # dimension codes are shared between tables so joins can happen on codes
+    pizza_type_ids = pd.CategoricalDtype(df_pizza_types["pizza_type_id"].unique())
+    pizza_ids = pd.CategoricalDtype(df_pizzas["pizza_id"].unique())
+
+    df_pizza_types = pd.DataFrame({
+        "pizza_type_id": df_pizza_types["pizza_type_id"].astype(pizza_type_ids),
+        "name": df_pizza_types["name"].astype(str),
+        "category": df_pizza_types["category"].astype("category"),
+        "ingredients": df_pizza_types["ingredients"].astype(str),
+    })
+
+    df_pizzas = pd.DataFrame({
+        "pizza_id": df_pizzas["pizza_id"].astype(pizza_ids),
+        "pizza_type_id": df_pizzas["pizza_type_id"].astype(pizza_type_ids),
+        "size": df_pizzas["size"].astype("category"),
+        "price": df_pizzas["price"].astype("float64"),
+    })
+
+    return type_order_details(df_order_details, pizza_ids), type_orders(df_orders), df_pizza_types, df_pizzas
+
+
+def type_orders(df_orders):
+    """
+    typed orders with their timestamp and calendar columns, in time order,
+    from date and time strings or epoch seconds in timestamp
+    """
+    if "timestamp" in df_orders:
+        timestamps = df_orders["timestamp"].to_numpy().astype("int64")
+    else:
+        timestamps = parse_timestamps(df_orders["date"], df_orders["time"])
+    df_orders = pd.DataFrame({
+        "order_id": df_orders["order_id"].astype("int32"),
+        "timestamp": timestamps,
+        **calendar_columns(timestamps),
+    })
+    # keep orders in time order so date ranges are contiguous
+    return timeindex.sort_by_time(df_orders, "timestamp")
+
+
+def type_order_details(df_order_details, pizza_ids):
+    """typed order details, pizza_id as the shared pizza categorical (unknown ids become NaN)"""
+    return pd.DataFrame({
+        "order_details_id": df_order_details["order_details_id"].astype("int32"),
+        "order_id": df_order_details["order_id"].astype("int32"),
+        "pizza_id": pd.Categorical(df_order_details["pizza_id"], dtype=pizza_ids),
+        "quantity": df_order_details["quantity"].astype("int16"),
+    })
+
+
+def reject_rows(df, checks, source, errors):
+    """df without the rows any of checks ((what, mask, values)) flags, each one reported once in errors"""
+    bad = np.zeros(len(df), dtype=bool)
+    for what, mask, values in checks:
+        mask = mask & ~bad
+        if mask.any():
+            errors.append("{}: {:,d} rows {} ({})".format(source, int(mask.sum()), what,
+                                                           ", ".join(map(str, pd.unique(values[mask])[:5]))))
+        bad |= mask
+    return df[~bad]
+
+
+def order_checks(df_orders, taken_ids=()):
+    """
+    (what, mask, values) of the typed orders that break a key or have no
+    usable time, ids in taken_ids are already used
+    """
+    order_ids = df_orders["order_id"].to_numpy()
+    timestamps = df_orders["timestamp"].to_numpy()
+    first, last = (np.datetime64(str(year), "s").astype("int64") for year in ORDER_YEARS)
+    return [
+        ("with an order id that is already taken",
+         np.isin(order_ids, taken_ids) | pd.Series(order_ids).duplicated().to_numpy(), order_ids),
+        ("without a date and time between {} and {}".format(*ORDER_YEARS),
+         (timestamps < first) | (timestamps >= last), order_ids),
+    ]
+
+
+def order_detail_checks(df_order_details, order_ids, taken_ids=(), pizza_ids=None):
+    """
+    (what, mask, values) of the typed order details that break a key:
+    ids in taken_ids are already used, order_ids are the known orders.
+    pizza_ids are the raw pizza ids to report, typing turned the unknown
+    ones into NaN.
+    """
+    detail_ids = df_order_details["order_details_id"].to_numpy()
+    detail_order_ids = df_order_details["order_id"].to_numpy()
+    quantity = df_order_details["quantity"].to_numpy()
+    return [
+        ("with an order details id that is already taken",
+         np.isin(detail_ids, taken_ids) | pd.Series(detail_ids).duplicated().to_numpy(), detail_ids),
+        ("for an unknown order", ~np.isin(detail_order_ids, order_ids), detail_order_ids),
+        ("with a pizza_id not in pizzas.csv", df_order_details["pizza_id"].isna().to_numpy(),
+         detail_ids if pizza_ids is None else pizza_ids),
+        ("with a quantity below 1", quantity < 1, quantity),
+    ]
+
+
+def drop_bad_rows(df_order_details, df_orders):
+    """the typed order details and orders without the rows that break a key, and what was dropped"""
+    errors = []
+    df_orders = reject_rows(df_orders, order_checks(df_orders), "orders.csv", errors)
+    checks = order_detail_checks(df_order_details, df_orders["order_id"].to_numpy())
+    df_order_details = reject_rows(df_order_details, checks, "order_details.csv", errors)
+    return df_order_details, df_orders, errors
+
+
+def _write_table(df, path):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # write to a temp file first so a half written snapshot is never mapped,
+    # named for this write so a build in another process keeps its own
+    tmp_path = "{}.{}.tmp".format(path, uuid.uuid4().hex[:8])
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def _month_key(month):
+    """YYYY-MM of a count of months since 1970-01"""
+    return str(np.datetime64(int(month), "M"))
+
+
+def _ids_path(out_dir, table):
+    return os.path.join(out_dir, table + "_ids.arrow")
+
+
+def partition_months(df_order_details, df_orders):
+    """month (counted from 1970-01) of every order and of every order line's order"""
+    order_months = (df_orders["year"].to_numpy().astype("int64") - 1970) * 12 + df_orders["month"].to_numpy() - 1
+    rows = pd.Index(df_orders["order_id"]).get_indexer(df_order_details["order_id"])
+    if (rows < 0).any():
+        missing = df_order_details["order_id"][rows < 0].unique()
+        raise KeyError("order details of unknown orders: {}".format(list(missing[:10])))
+    return order_months, order_months[rows]
+
+
+def _write_partitions(df, months, out_dir):
+    """one file per month, rows keep their order within a month"""
+    os.makedirs(out_dir, exist_ok=True)
+    order = np.argsort(months, kind="mergesort")
+    keys, starts = np.unique(months[order], return_index=True)
+    written = set()
+    for key, rows in zip(keys, np.split(order, starts[1:])):
+        name = _month_key(key)
+        _write_table(df.iloc[rows], os.path.join(out_dir, name + ".arrow"))
+        written.add(name + ".arrow")
+    # months left over from an older build, temp files may be another build's
+    for name in os.listdir(out_dir):
+        if name.endswith(".arrow") and name not in written:
+            os.remove(os.path.join(out_dir, name))
+    return [_month_key(key) for key in keys]
+
+
+def build_snapshot(data_dir=DATA_DIR):
+    """rebuild the snapshot from the csv files and write the manifest"""
+    with _BUILD_LOCK:
+        return _build_snapshot(data_dir)
+
+
+def ensure_snapshot(data_dir=DATA_DIR):
+    """
+    rebuild the snapshot if it is stale, True if this call did. Sessions
+    that find it stale together wait for one build instead of each
+    running their own.
+    """
+    if not is_stale(data_dir):
+        return False
+    with _BUILD_LOCK:
+        # built by the thread this one waited for
+        if not is_stale(data_dir):
+            return False
+        _build_snapshot(data_dir)
+    return True
+
+
+def _build_snapshot(data_dir):
+    out_dir = snapshot_dir(data_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    checksums = source_checksums(data_dir)
+    stats = source_stats(data_dir)
+    df_order_details, df_orders, df_pizza_types, df_pizzas = read_csv_tables(data_dir)
+    # a bad row is left out and reported, the pages keep working
+    df_order_details, df_orders, rejected = drop_bad_rows(df_order_details, df_orders)
+    _write_table(df_pizza_types, os.path.join(out_dir, "pizza_types.arrow"))
+    _write_table(df_pizzas, os.path.join(out_dir, "pizzas.arrow"))
+    order_months, detail_months = partition_months(df_order_details, df_orders)
+    for table in PARTITIONED:
+        # unpartitioned file of an older snapshot layout
+        if os.path.exists(os.path.join(out_dir, table + ".arrow")):
+            os.remove(os.path.join(out_dir, table + ".arrow"))
+    # an order and its lines always land in the same month
+    partitions = _write_partitions(df_orders, order_months, os.path.join(out_dir, "orders"))
+    _write_partitions(df_order_details, detail_months, os.path.join(out_dir, "order_details"))
+    for table, df in [("orders", df_orders), ("order_details", df_order_details)]:
+        _write_table(df[[ID_COLUMNS[table]]], _ids_path(out_dir, table))
+    manifest = {"version": SNAPSHOT_VERSION, "checksums": checksums, "stats": stats,
+                "tails": source_tails(data_dir, stats), "partitions": partitions, "rejected": rejected}
+    # the manifest goes last, readers see the old build or the new one
+    _write_manifest(data_dir, manifest)
+    return manifest
+
+
+def _map_table(path):
+    # memory map the file, arrow reads the buffers without copying
+    source = pa.memory_map(path, "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def partitions(data_dir=DATA_DIR):
+    """YYYY-MM of every month in the snapshot, in order"""
+    return (_read_manifest(data_dir) or {}).get("partitions", [])
+
+
+def rejected(data_dir=DATA_DIR):
+    """what the last build left out of the snapshot, see drop_bad_rows"""
+    return (_read_manifest(data_dir) or {}).get("rejected", [])
+
+
+def prune(keys, start=None, end=None):
+    """the months of keys that overlap the dates [start, end] (either may be None)"""
+    first = None if start is None else str(np.datetime64(start, "M"))
+    last = None if end is None else str(np.datetime64(end, "M"))
+    return [key for key in keys if (first is None or key >= first) and (last is None or key <= last)]
+
+
+def window(start=None, end=None, data_dir=DATA_DIR):
+    """first and last month of the snapshot to load for the dates [start, end], the latest month when none overlap"""
+    months = partitions(data_dir)
+    months = prune(months, start, end) or months[-1:]
+    return months[0], months[-1]
+
+
+def _load_partitioned(out_dir, table, keys):
+    tables = [_map_table(os.path.join(out_dir, table, key + ".arrow")) for key in keys]
+    return pa.concat_tables(tables).to_pandas()
+
+
+def load_snapshot(data_dir=DATA_DIR, start=None, end=None):
+    """
+    Load the four tables from the snapshot, rebuilding it first if the
+    source csv files changed. Given a date range only the orders and
+    order details of the months overlapping it are read.
+
+    Returns order_details, orders, pizza_types, pizzas in the same order
+    the csv files used to be read in.
+    """
+    ensure_snapshot(data_dir)
+    out_dir = snapshot_dir(data_dir)
+    keys = prune(partitions(data_dir), start, end)
+    if not keys:
+        raise ValueError("no data between {} and {}".format(start, end))
+    return [
+        _load_partitioned(out_dir, table, keys) if table in PARTITIONED
+        else _map_table(os.path.join(out_dir, table + ".arrow")).to_pandas()
+        for table in TABLES
+    ]
+
+
+def load_ids(data_dir=DATA_DIR):
+    """{table: every id} of the orders and order details in the snapshot, whichever months are loaded"""
+    out_dir = snapshot_dir(data_dir)
+    return {table: _map_table(_ids_path(out_dir, table)).column(0).to_numpy() for table in PARTITIONED}
+
+
+def snapshot_version(data_dir=DATA_DIR):
+    """identifier of the data currently in the snapshot"""
+    manifest = _read_manifest(data_dir) or {}
+    digest = hashlib.sha256(json.dumps(manifest.get("checksums", {}), sort_keys=True).encode())
+    return digest.hexdigest()[:16]
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Synthetic Data
+
+Deterministic generator for order data at a multiple of the bundled
+dataset. It learns the orders per weekday, hour of day, lines per order,
+pizza mix (and with it the size mix) and quantity distributions from
+pizza_sales/ and writes csv files with the same schema.
+
+Scale is spread over time first and volume second: up to 10x adds years
+of history, beyond that every day gets proportionally more orders (as if
+more stores reported into the same dashboard).
+"""
+
+# import libraries
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from pizza_place import storage
+
+
+MAX_YEARS = 10
+
+
+class Profile:
+    """empirical distributions of the source data"""
+
+    def __init__(self, data_dir=storage.DATA_DIR):
+        df_order_details, df_orders, df_pizza_types, df_pizzas = storage.read_csv_tables(data_dir)
+        days = df_orders["day"]
+
+        self.first_day = pd.Timestamp(np.datetime64(int(days.min()), "D"))
+        # mean orders on each weekday (monday = 0) over days the shop was open
+        per_day = df_orders.groupby("day")["weekday"].agg(["first", "size"])
+        self.orders_per_weekday = per_day.groupby("first")["size"].mean().reindex(range(7), fill_value=0).to_numpy()
+        self.open_days = len(per_day) / (int(days.max() - days.min()) + 1)
+
+        self.hour_p = np.bincount(df_orders["hour"], minlength=24) / len(df_orders)
+
+        lines_per_order = df_order_details.groupby("order_id").size()
+        self.lines_values, counts = np.unique(lines_per_order, return_counts=True)
+        self.lines_p = counts / counts.sum()
+
+        self.pizza_ids = df_order_details["pizza_id"].cat.categories
+        pizza_counts = np.bincount(df_order_details["pizza_id"].cat.codes, minlength=len(self.pizza_ids))
+        self.pizza_p = pizza_counts / pizza_counts.sum()
+
+        self.quantity_values, counts = np.unique(df_order_details["quantity"], return_counts=True)
+        self.quantity_p = counts / counts.sum()
+
+
+def _split_scale(scale):
+    years = int(min(max(round(scale), 1), MAX_YEARS))
+    return years, scale / years
+
+
+def _generate_year(profile, rng, year_start, density, first_order_id, first_line_id):
+    days = pd.date_range(year_start, year_start + pd.DateOffset(years=1) - pd.Timedelta(days=1), freq="D")
+    # closed days happen about as often as in the source year
+    open_days = rng.random(len(days)) < profile.open_days
+    lam = profile.orders_per_weekday[days.weekday] * density * open_days
+    orders_per_day = rng.poisson(lam)
+    n_orders = int(orders_per_day.sum())
+
+    day = np.repeat(days.values.astype("datetime64[s]"), orders_per_day)
+    seconds = rng.choice(24, size=n_orders, p=profile.hour_p) * 3600 + rng.integers(0, 3600, size=n_orders)
+    stamps = day + seconds.astype("timedelta64[s]")
+    stamps.sort()
+
+    order_ids = np.arange(first_order_id, first_order_id + n_orders, dtype="int64")
+    df_orders = pd.DataFrame({
+        "order_id": order_ids,
+        "date": np.datetime_as_string(stamps, unit="D"),
+        "time": pd.to_datetime(stamps).strftime("%H:%M:%S"),
+    })
+
+    lines = rng.choice(profile.lines_values, size=n_orders, p=profile.lines_p)
+    n_lines = int(lines.sum())
+    df_order_details = pd.DataFrame({
+        "order_details_id": np.arange(first_line_id, first_line_id + n_lines, dtype="int64"),
+        "order_id": np.repeat(order_ids, lines),
+        "pizza_id": profile.pizza_ids.take(rng.choice(len(profile.pizza_ids), size=n_lines, p=profile.pizza_p)),
+        "quantity": rng.choice(profile.quantity_values, size=n_lines, p=profile.quantity_p),
+    })
+    return df_orders, df_order_details
+
+
+def generate(out_dir, scale=1, seed=0, data_dir=storage.DATA_DIR):
+    """
+    Write orders.csv and order_details.csv at scale times the source rows
+    (plus copies of pizzas.csv and pizza_types.csv) to out_dir. The same
+    scale and seed always give the same files.
+    """
+    profile = Profile(data_dir)
+    rng = np.random.default_rng(seed)
+    years, density = _split_scale(scale)
+    os.makedirs(out_dir, exist_ok=True)
+    for table in ["pizzas", "pizza_types"]:
+        shutil.copyfile(os.path.join(data_dir, table + ".csv"), os.path.join(out_dir, table + ".csv"))
+
+    next_order_id, next_line_id = 1, 1
+    orders_path = os.path.join(out_dir, "orders.csv")
+    details_path = os.path.join(out_dir, "order_details.csv")
+    # one year at a time keeps memory bounded at large scales
+    for i in range(years):
+        year_start = profile.first_day + pd.DateOffset(years=i)
+        df_orders, df_order_details = _generate_year(profile, rng, year_start, density, next_order_id, next_line_id)
+        df_orders.to_csv(orders_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        df_order_details.to_csv(details_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        next_order_id += len(df_orders)
+        next_line_id += len(df_order_details)
+    return {"orders": next_order_id - 1, "order_details": next_line_id - 1, "years": years}
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Time Index
+
+Orders and order lines are kept sorted by time, so a date range resolves to
+a contiguous block of rows with two binary searches instead of building
+boolean masks over the whole table on every rerun.
+"""
+
+# import libraries
+import numpy as np
+import pandas as pd
+
+
+def sort_by_time(df, column="datetime"):
+    """df sorted by column (stable), untouched if it already is"""
+    if df[column].is_monotonic_increasing:
+        return df
+    return df.sort_values(column, kind="mergesort", ignore_index=True)
+
+
+def _insert_column(values, new_values, at):
+    """values with new_values inserted before the positions at, categoricals by their codes"""
+    new_values = new_values.astype(values.dtype)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = np.insert(values.cat.codes.to_numpy(), at, new_values.cat.codes.to_numpy())
+        return pd.Categorical.from_codes(codes, dtype=values.dtype)
+    return np.insert(values.to_numpy(), at, new_values.to_numpy())
+
+
+def insert_rows(df, df_new, column="datetime"):
+    """
+    df with the rows of df_new (sorted by column, same columns and types)
+    put in at their time, after the rows of df at the same time, and the
+    row numbers they got. Every column is copied once with the new values
+    in place, the history is not sorted again.
+    """
+    at = np.searchsorted(df[column].to_numpy(), df_new[column].to_numpy(), side="right")
+    df = pd.DataFrame({name: _insert_column(df[name], df_new[name], at) for name in df.columns}, copy=False)
+    return df, at + np.arange(len(at))
+
+
+def day_bounds(start, end):
+    """
+    Half open [first second, last second + 1) of the inclusive date range,
+    accepting dates, datetimes, strings or numpy datetimes.
+    """
+    first = np.datetime64(np.datetime64(start, "D"), "s")
+    stop = np.datetime64(np.datetime64(end, "D") + 1, "s")
+    return first, stop
+
+
+class TimeIndex:
+    """row offsets of a time sorted table"""
+
+    def __init__(self, datetimes):
+        self.seconds = np.asarray(datetimes, dtype="datetime64[s]")
+        if len(self.seconds) and (np.diff(self.seconds.view("int64")) < 0).any():
+            raise ValueError("TimeIndex needs rows sorted by time, use sort_by_time first")
+
+    def __len__(self):
+        return len(self.seconds)
+
+    def rows(self, start, end):
+        """slice of the rows that fall on the dates [start, end]"""
+        first, stop = day_bounds(start, end)
+        lo, hi = np.searchsorted(self.seconds, [first, stop], side="left")
+        return slice(int(lo), int(hi))
+
+    def day_rows(self, days):
+        """row numbers of the rows that fall on the given days (day numbers since 1970-01-01)"""
+        first = np.asarray(days, dtype="int64").astype("datetime64[D]").astype("datetime64[s]")
+        lo = np.searchsorted(self.seconds, first, side="left")
+        hi = np.searchsorted(self.seconds, first + 86400, side="left")
+        return np.concatenate([np.arange(l, h) for l, h in zip(lo, hi)] + [np.zeros(0, dtype="int64")])
+
+    def insert(self, datetimes, rows):
+        """index of the table with rows inserted at row numbers rows (see insert_rows)"""
+        seconds = np.empty(len(self.seconds) + len(rows), dtype="datetime64[s]")
+        kept = np.ones(len(seconds), dtype=bool)
+        kept[rows] = False
+        seconds[kept] = self.seconds
+        seconds[rows] = np.asarray(datetimes, dtype="datetime64[s]")
+        index = TimeIndex(seconds[:0])
+        index.seconds = seconds
+        return index
+
+    def take(self, df, start, end):
+        """the rows of df (sorted like this index) within [start, end]"""
+        return df.iloc[self.rows(start, end)]
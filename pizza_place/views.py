@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Views
+
+Results of every page for the standard date ranges (the full history,
+every month and every quarter), computed offline and written next to the
+snapshot:
+
+    python -m pizza_place materialize
+
+An engine loaded over the same snapshot serves those ranges from the file
+without computing anything, other ranges are computed live as before. The
+file is tied to the snapshot version (and the pandas it was pickled with),
+so a rebuilt snapshot or newly ingested orders simply stop using it until
+the job runs again.
+"""
+
+# import libraries
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from pizza_place import storage
+
+
+VIEWS_NAME = "views.pickle"
+# bump when the layout of the file changes
+VIEWS_VERSION = 1
+
+
+def views_path(data_dir=storage.DATA_DIR):
+    return os.path.join(storage.snapshot_dir(data_dir), VIEWS_NAME)
+
+
+def _day(value):
+    return str(np.datetime64(value, "D"))
+
+
+def key(name, start, end):
+    """key of a result, dates of any type as YYYY-MM-DD"""
+    return name, _day(start), _day(end)
+
+
+def standard_ranges(first, last):
+    """the full history [first, last], then every calendar month and quarter it touches"""
+    first, last = np.datetime64(first, "D"), np.datetime64(last, "D")
+    ranges = [(first, last)]
+    months = np.arange(first.astype("datetime64[M]"), last.astype("datetime64[M]") + 1)
+    quarters = np.unique(months - months.astype("int64") % 3)
+    for starts, n_months in [(months, 1), (quarters, 3)]:
+        for month in starts:
+            ranges.append((month.astype("datetime64[D]"), (month + n_months).astype("datetime64[D]") - 1))
+    return [(start.astype(object), end.astype(object)) for start, end in ranges]
+
+
+class Views:
+    """materialized results of one snapshot version, keyed by name, start and end"""
+
+    def __init__(self, version, results=None, ranges=None):
+        self.version = version
+        self.results = {} if results is None else results
+        self.ranges = [] if ranges is None else ranges
+
+    def __len__(self):
+        return len(self.results)
+
+    def get(self, name, start, end):
+        """the result of name over [start, end], KeyError if it was not materialized"""
+        return self.results[key(name, start, end)]
+
+    @classmethod
+    def build(cls, engine, ranges, calls):
+        """
+        run calls(start, end), which yields (method, args) pairs, on the
+        engine for every range
+        """
+        views = cls(engine.version, ranges=[(_day(start), _day(end)) for start, end in ranges])
+        for start, end in ranges:
+            for method, args in calls(start, end):
+                value = getattr(engine, method)(start, end, *args)
+                views.results[key((method,) + tuple(args), start, end)] = value
+        return views
+
+    def write(self, path):
+        """write the views to path, replacing the file in one step"""
+        header = {"format": VIEWS_VERSION, "version": self.version, "pandas": pd.__version__}
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump((self.ranges, self.results), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def read(cls, path, version):
+        """the views at path if they were built for this version, else None"""
+        try:
+            with open(path, "rb") as f:
+                header = pickle.load(f)
+                if header != {"format": VIEWS_VERSION, "version": version, "pandas": pd.__version__}:
+                    return None
+                ranges, results = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return cls(version, results, ranges)
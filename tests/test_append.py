@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Append Tests
+
+An engine that had orders appended to it (late lines of orders it
+already had, new orders out of time order) has to hold the same rollups,
+period totals, sketches, baskets and raw table sort orders as one built
+from every row at once.
+
+    python -m pytest
+"""
+
+# import libraries
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pizza_place import analytics, basket, browser, cache, storage
+
+
+RANGES = [
+    (datetime.date(2015, 1, 1), datetime.date(2015, 12, 31)),
+    (datetime.date(2015, 3, 1), datetime.date(2015, 3, 31)),
+    (datetime.date(2015, 9, 20), datetime.date(2015, 10, 12)),
+    (datetime.date(2015, 12, 24), datetime.date(2015, 12, 26)),
+]
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return storage.read_csv_tables(storage.DATA_DIR)
+
+
+@pytest.fixture(scope="module")
+def engines(tables):
+    """an engine over every row, and one built from the orders before october with the rest appended"""
+    df_order_details, df_orders, df_pizza_types, df_pizzas = tables
+    results = cache.ResultCache(maxsize=0)
+    full = analytics.Analytics(df_order_details, df_orders, df_pizza_types, df_pizzas, version="full", results=results)
+
+    before = df_orders["timestamp"] < pd.Timestamp("2015-10-01").value // 10 ** 9
+    base_details = np.isin(df_order_details["order_id"], df_orders["order_id"][before])
+    # a few lines of september orders come in late
+    late = base_details & (df_order_details["order_details_id"] % 97 == 0).to_numpy()
+    engine = analytics.Analytics(df_order_details[base_details & ~late], df_orders[before], df_pizza_types, df_pizzas,
+                                 version="base", results=results)
+    # sort orders built before the appends are carried over
+    for name in ["orders", "order_details"]:
+        for column in engine.raw_tables[name].df.columns:
+            engine.raw_tables[name].sort_order(column)
+
+    new_orders = df_orders[~before]
+    new_details = df_order_details[~base_details]
+    # december arrives before october and november
+    december = new_orders["timestamp"] >= pd.Timestamp("2015-12-01").value // 10 ** 9
+    in_december = np.isin(new_details["order_id"], new_orders["order_id"][december])
+    engine = engine.append(new_details[in_december], new_orders[december])
+    engine = engine.append(pd.concat([new_details[~in_december], df_order_details[late]], ignore_index=True),
+                           new_orders[~december])
+    return full, engine
+
+
+def test_fact_table_matches_rebuild(engines):
+    full, engine = engines
+    assert (np.diff(engine.line_index.seconds.astype("int64")) >= 0).all()
+    np.testing.assert_array_equal(engine.line_index.seconds, engine.df_order_lines["datetime"].to_numpy().astype("datetime64[s]"))
+    for name, key in [("df_order_lines", "order_details_id"), ("df_orders", "order_id")]:
+        df, df_full = getattr(engine, name), getattr(full, name)
+        pd.testing.assert_frame_equal(df.sort_values(key, ignore_index=True), df_full.sort_values(key, ignore_index=True))
+    np.testing.assert_array_equal(engine.order_index.order_ids, full.order_index.order_ids)
+    np.testing.assert_array_equal(engine.order_index.timestamps, full.order_index.timestamps)
+
+
+def test_browser_sort_orders_carried_over(engines):
+    _, engine = engines
+    for name in ["orders", "order_details"]:
+        table = engine.raw_tables[name]
+        fresh = browser.TableBrowser(table.df)
+        for column in table.df.columns:
+            for got, want in zip(table.sort_order(column), fresh.sort_order(column)):
+                np.testing.assert_array_equal(got, want, err_msg="{}.{}".format(name, column))
+
+
+def test_browser_insert_few_rows():
+    df = pd.DataFrame({"a": [1, 2, 2, 3, 5], "b": pd.Categorical(["x", "y", "x", "y", "x"])})
+    table = browser.TableBrowser(df)
+    for column in df.columns:
+        table.sort_order(column)
+    new = pd.DataFrame({"a": [2, 4, 2], "b": pd.Categorical(["y", "x", "x"], categories=df["b"].cat.categories)})
+    rows = np.array([0, 3, 6])
+    combined = pd.DataFrame({"a": [2, 1, 2, 4, 2, 3, 2, 5], "b": pd.Categorical(list("yxyxxyxx"))})
+    inserted = table.insert(combined, rows)
+    fresh = browser.TableBrowser(combined)
+    for column in df.columns:
+        for got, want in zip(inserted.sort_order(column), fresh.sort_order(column)):
+            np.testing.assert_array_equal(got, want, err_msg=column)
+
+
+def _cells(c):
+    """the cube's pizza cells as (day, hour, pizza) sorted rows"""
+    keys = np.column_stack([c.cell_day, c.cell_hour, c.cell_pizza])
+    order = np.lexsort(keys.T[::-1])
+    return keys[order], c.cell_quantity[order], c.cell_revenue[order]
+
+
+def test_cube_merge_matches_rebuild(engines):
+    full, engine = engines
+    assert engine.cube.first_day == full.cube.first_day
+    np.testing.assert_array_equal(engine.cube.order_counts, full.cube.order_counts)
+    full_keys, full_quantity, full_revenue = _cells(full.cube)
+    keys, quantity, revenue = _cells(engine.cube)
+    np.testing.assert_array_equal(keys, full_keys)
+    np.testing.assert_array_equal(quantity, full_quantity)
+    np.testing.assert_allclose(revenue, full_revenue)
+    for start, end in RANGES:
+        for period in analytics.PERIODS:
+            pd.testing.assert_frame_equal(engine.orders_by_period(start, end, period), full.orders_by_period(start, end, period))
+            pd.testing.assert_frame_equal(engine.sales_by_period(start, end, period), full.sales_by_period(start, end, period))
+        for by in analytics.DIMENSIONS:
+            pd.testing.assert_frame_equal(engine.best_sellers(start, end, by, "revenue"), full.best_sellers(start, end, by, "revenue"))
+
+
+def test_period_totals_add_matches_rebuild(engines):
+    full, engine = engines
+    assert engine.period_totals.totals.keys() == full.period_totals.totals.keys()
+    for period, (first, orders, revenue) in full.period_totals.totals.items():
+        engine_first, engine_orders, engine_revenue = engine.period_totals.totals[period]
+        assert engine_first == first
+        np.testing.assert_array_equal(engine_orders, orders)
+        np.testing.assert_allclose(engine_revenue, revenue)
+
+
+@pytest.mark.parametrize("value", analytics.VALUES)
+def test_sketches_replace_matches_rebuild(engines, value):
+    full, engine = engines
+    full_sketches, sketches = full.order_sketches[value], engine.order_sketches[value]
+    for name in ["days", "count", "low", "high", "cell_day", "cell_bucket", "cell_count"]:
+        np.testing.assert_array_equal(getattr(sketches, name), getattr(full_sketches, name), err_msg=name)
+    np.testing.assert_allclose(sketches.total, full_sketches.total)
+    for start, end in RANGES:
+        np.testing.assert_array_equal(sketches.quantiles(start, end), full_sketches.quantiles(start, end))
+
+
+@pytest.mark.parametrize("level", basket.LEVELS)
+def test_baskets_append_matches_rebuild(engines, level):
+    full, engine = engines
+    assert (np.diff(engine.baskets.index.seconds.astype("int64")) >= 0).all()
+    for start, end in RANGES:
+        full_members, full_counts, full_orders = full.baskets.cooccurrence(start, end, level)
+        members, counts, n_orders = engine.baskets.cooccurrence(start, end, level)
+        assert members.equals(full_members)
+        assert n_orders == full_orders
+        np.testing.assert_array_equal(counts, full_counts)
+
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Browser Tests
+
+The raw table filters select the same rows as the pandas masks they
+stand for, and filters every row passes select everything.
+
+    python -m pytest
+"""
+
+# import libraries
+import numpy as np
+import pandas as pd
+import pytest
+
+from pizza_place import analytics, browser, cache, storage
+
+
+@pytest.fixture(scope="module")
+def table():
+    """the order details raw table of an engine over every row"""
+    engine = analytics.Analytics(*storage.read_csv_tables(storage.DATA_DIR), version="test", results=cache.ResultCache())
+    return engine.raw_tables["order_details"]
+
+
+def test_browser_select_intersects_filters(table):
+    df = table.df
+    first, stop = np.datetime64("2015-06-01", "ns"), np.datetime64("2015-06-08", "ns")
+    cases = [
+        ({"order_id": (1000, 2000)}, df["order_id"].between(1000, 2000)),
+        ({"order_id": (None, 500), "size": ["L"]}, (df["order_id"] <= 500) & (df["size"] == "L")),
+        ({"datetime": (first, stop), "pizza_id": ["hawaiian_m", "bbq_ckn_l", "not_a_pizza"]},
+         df["datetime"].between(first, stop) & df["pizza_id"].isin(["hawaiian_m", "bbq_ckn_l"])),
+        ({"order_id": (5000, None), "datetime": (first, stop), "size": ["S", "XL"], "pizza_id": ["big_meat_s"]},
+         (df["order_id"] >= 5000) & df["datetime"].between(first, stop) & df["size"].isin(["S", "XL"])
+         & (df["pizza_id"] == "big_meat_s")),
+        ({"order_id": (10, 5)}, pd.Series(False, index=df.index)),
+        ({"order_id": (-10 ** 12, 10 ** 12), "size": ["L"]}, df["size"] == "L"),
+    ]
+    for filters, mask in cases:
+        np.testing.assert_array_equal(table.select(filters), np.flatnonzero(mask.to_numpy()), err_msg=str(filters))
+    assert table.select() is None
+    # filters every row passes, like the pages' defaults, select everything
+    everything = {"order_id": (df["order_id"].min(), df["order_id"].max()), "datetime": (None, None),
+                  "size": list(df["size"].cat.categories)}
+    assert table.select(everything) is None
+    np.testing.assert_array_equal(table.select(dict(everything, pizza_id=["big_meat_s"])),
+                                  np.flatnonzero((df["pizza_id"] == "big_meat_s").to_numpy()))
+
+
+def test_browser_select_new_table():
+    df = pd.DataFrame({"a": [3, 1, 2, 3, 1], "b": pd.Categorical(["x", "y", "x", "y", "x"])})
+    table = browser.TableBrowser(df)
+    np.testing.assert_array_equal(table.select({"a": (2, 3), "b": ["x"]}), [0, 2])
+    np.testing.assert_array_equal(table.select({"b": ["y"], "a": (None, 1)}), [1])
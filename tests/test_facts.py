@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Facts Tests
+
+A line whose pizza_id is not in pizzas.csv must not be joined to some
+other pizza and counted as revenue.
+
+    python -m pytest
+"""
+
+# import libraries
+import pandas as pd
+import pytest
+
+from pizza_place import facts, storage
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return storage.read_csv_tables(storage.DATA_DIR)
+
+
+def test_unknown_pizza_id_raises(tables):
+    _, df_orders, df_pizza_types, df_pizzas = tables
+    raw = pd.DataFrame({"order_details_id": [48623], "order_id": [21350], "pizza_id": ["nope"], "quantity": [1]})
+    # typed against the known pizzas, an unknown id becomes NaN
+    typed = storage.type_order_details(raw, pd.CategoricalDtype(df_pizzas["pizza_id"]))
+    assert typed["pizza_id"].isna().all()
+    for df_order_details in [raw, typed]:
+        with pytest.raises(KeyError):
+            facts.build_order_lines(df_order_details, df_orders, df_pizza_types, df_pizzas)
+
+
+def test_pizza_rows_resolves_known_ids(tables):
+    df_pizza_dims = facts.build_pizza_dimensions(*tables[2:])
+    rows = facts.pizza_rows(["bbq_ckn_l", "hawaiian_m", "bbq_ckn_l"], df_pizza_dims)
+    assert df_pizza_dims["pizza_id"].to_numpy()[rows].tolist() == ["bbq_ckn_l", "hawaiian_m", "bbq_ckn_l"]
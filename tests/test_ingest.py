@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Ingest Tests
+
+Rows of a batch without a usable date and time are rejected one by one,
+the rest of the batch is still applied.
+
+    python -m pytest
+"""
+
+# import libraries
+import numpy as np
+import pandas as pd
+import pytest
+
+from pizza_place import analytics, cache, ingest, storage
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return analytics.Analytics(*storage.read_csv_tables(storage.DATA_DIR), version="test",
+                               results=cache.ResultCache(maxsize=0))
+
+
+def test_validate_rejects_bad_timestamps(engine):
+    df_orders = pd.DataFrame({
+        "order_id": [30001, 30002, 30003, 30004, 30005, 30006],
+        "date": ["2016-01-01", "", np.nan, "2016-01-01", "1970-01-01", "2016-01-01"],
+        "time": ["12:00:00", "12:00:00", "12:00:00", np.nan, "12:00:00", "25:99:00"],
+    })
+    df_order_details = pd.DataFrame({"order_details_id": [60001, 60002], "order_id": [30001, 30002],
+                                     "pizza_id": ["hawaiian_m", "hawaiian_m"], "quantity": [1, 1]})
+    df_order_details, df_orders, errors = ingest.validate(df_order_details, df_orders, engine)
+    assert df_orders["order_id"].tolist() == [30001]
+    assert df_order_details["order_details_id"].tolist() == [60001]
+    assert len(errors) == 2
+    assert "5 rows without a date and time" in errors[0]
+    assert "unknown order (30002)" in errors[1]
+    # the rows that pass append like any other
+    appended = engine.append(df_order_details, df_orders)
+    assert appended.last_date == pd.Timestamp("2016-01-01").date()
+
+
+@pytest.mark.parametrize("dates, times", [
+    (["2015-01-01", ""], ["12:00:00", "13:00:00"]),
+    (["2015-01-01", None], ["12:00:00", "13:00:00"]),
+    (["2015-01-01", "2015-01-01"], ["12:00:00", None]),
+    (["2015-01-01", "2015-01-01"], ["12:00:00", "noon"]),
+])
+def test_parse_timestamps_marks_missing_values(dates, times):
+    timestamps = storage.parse_timestamps(pd.Series(dates, dtype=object), pd.Series(times, dtype=object))
+    assert timestamps.tolist() == [pd.Timestamp("2015-01-01 12:00:00").value // 10 ** 9, storage.NO_TIMESTAMP]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Metrics Tests
+
+Every cached result a page shows is recorded as a section of its run,
+including the home page's KPIs of the latest period, which take no date
+range.
+
+    python -m pytest
+"""
+
+# import libraries
+import datetime
+
+from pizza_place import analytics, cache, metrics, storage
+
+
+def test_instrumented_records_cached_results():
+    results = cache.ResultCache()
+    engine = analytics.Analytics(*storage.read_csv_tables(storage.DATA_DIR), version="test", results=results)
+    recorder = metrics.Recorder(results=results)
+    instrumented = metrics.Instrumented(engine, recorder, page="home", session="test", run=1)
+    start, end = datetime.date(2015, 3, 1), datetime.date(2015, 3, 31)
+
+    assert instrumented.period_kpis("week") == engine.period_kpis("week")
+    instrumented.period_kpis("week")
+    instrumented.best_sellers(start, end, "name", "quantity")
+    records = recorder.recent(page="home", session="test", run=1)
+    assert [record["section"] for record in records] == ["period_kpis.week", "period_kpis.week", "best_sellers.name.quantity"]
+    assert records[0]["rows"] == len(engine.df_order_lines)
+    assert records[1]["cache_hits"] == 1
+    assert records[2]["rows"] == engine.n_lines(start, end)
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Report Tests
+
+The report only computes the sections asked for, so a section that
+cannot be computed for a range does not fail the others.
+
+    python -m pytest
+"""
+
+# import libraries
+import datetime
+
+import pytest
+
+from pizza_place import analytics, cache, storage
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return analytics.Analytics(*storage.read_csv_tables(storage.DATA_DIR), version="test", results=cache.ResultCache())
+
+
+def test_report_computes_only_the_sections_asked_for(engine):
+    start, end = datetime.date(2015, 12, 20), datetime.date(2016, 1, 10)
+    sections = engine.report(start, end, ["order_kpis", "orders_by_month"])
+    assert list(sections) == ["order_kpis", "orders_by_month"]
+    assert engine.results.misses == 2
+    assert set(engine.report(start, end)) == set(engine.report_sections(start, end))
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+Pizza Place Seasonality Tests
+
+A range can span more than two weeks with fewer days of sales than that,
+those series are left out instead of failing the decomposition.
+
+    python -m pytest
+"""
+
+# import libraries
+import numpy as np
+
+from pizza_place import seasonality
+
+
+def test_short_series_are_skipped():
+    rng = np.random.default_rng(0)
+    series = {"short": rng.uniform(1, 2, 2 * seasonality.PERIOD - 1), "long": rng.uniform(1, 2, 4 * seasonality.PERIOD),
+              "closed": np.zeros(4 * seasonality.PERIOD)}
+    results = seasonality.decompose_many(series, workers=1)
+    assert list(results) == ["long"]
+    assert seasonality.to_frame(np.arange(11), {}).empty